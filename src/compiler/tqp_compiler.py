@@ -3,17 +3,50 @@ from ir import IROptimizer
 from planner import TQPPlanner
 from executor import TQPExecutor
 
+from collections import OrderedDict
+from typing import Hashable, Optional
+
 
 class TQPCompiler:
     """Full TQP compilation pipeline: Spark Plan -> IR -> Optimized IR -> Tensor Programs"""
 
-    def __init__(self):
+    def __init__(self, maxsize: int = 64, device: Optional[str] = None):
         self.parser = SparkPhysicalPlanParser()
         self.optimizer = IROptimizer()
-        self.planner = TQPPlanner()
+        # Joins run on `device` when given (see RelationalOperators._join_inputs)
+        self.planner = TQPPlanner(device=device)
+        # LRU of executors keyed by Spark plan fingerprint, bounded by maxsize
+        self.maxsize = maxsize
+        self._executor_cache: 'OrderedDict[Hashable, TQPExecutor]' = OrderedDict()
+
+    def set_maxsize(self, maxsize: int):
+        """Resize the compile cache, evicting least recently used entries"""
+        self.maxsize = maxsize
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries beyond maxsize"""
+        while len(self._executor_cache) > self.maxsize:
+            self._executor_cache.popitem(last=False)
 
     def compile(self, spark_plan: SparkPhysicalPlan) -> TQPExecutor:
-        """Execute full 4-layer compilation pipeline"""
+        """Execute full 4-layer compilation pipeline
+
+        A Spark plan seen before returns its cached executor without recompiling.
+        """
+        key = spark_plan.fingerprint()
+        executor = self._executor_cache.get(key)
+        if executor is not None:
+            self._executor_cache.move_to_end(key)
+            return executor
+
+        executor = self._compile_uncached(spark_plan)
+        self._executor_cache[key] = executor
+        self._evict()
+        return executor
+
+    def _compile_uncached(self, spark_plan: SparkPhysicalPlan) -> TQPExecutor:
+        """Run the full pipeline for a Spark plan"""
         # Layer 1: Parse Spark physical plan to IR
         ir = self.parser.parse(spark_plan)
 
@@ -1,6 +1,10 @@
-from typing import Callable, Dict, List, Tuple, Any, Union
+from typing import Callable, Dict, List, Optional, Tuple, Any, Union
 from tensor import TensorTable
 
+import functools
+import inspect
+import logging
+
 # Legacy plan element: Tuple[str, Callable, Dict]
 LegacyPlanElem = Tuple[str, Callable, Dict]
 
@@ -8,6 +12,8 @@ LegacyPlanElem = Tuple[str, Callable, Dict]
 PlanNode = Dict[str, Any]
 PlanElem = Union[LegacyPlanElem, PlanNode]
 
+logger = logging.getLogger(__name__)
+
 
 class TQPExecutor:
     """Executor for tensor-query plans.
@@ -25,110 +31,69 @@ class TQPExecutor:
     New style is preferred: it uses a named-environment model (env) and
     a stable operator signature: Callable[[List[TensorTable], Dict], TensorTable].
     Legacy style is adapted to the new env model where possible.
+
+    The plan is compiled once at construction into parallel arrays (one entry
+    per operator): a call with the operator's calling convention and the env
+    slots of its inputs resolved, and the env slot of its output. Every table
+    name is assigned a small integer slot, so at execution time env is a list
+    and execute() is a plain indexed loop.
     """
 
     def __init__(self, plan: List[PlanElem]):
         self.plan = plan
-    
-    def _resolve_legacy_input(self, last_name: str, params: Dict, env: Dict[str, TensorTable]) -> TensorTable:
-        """Resolve input for legacy-style ops.
-
-        Priority:
-          1. last_name (previous result) if set
-          2. params['table'] if provided (common for scan/filter emitted without a scan step)
-          3. params['input'] if provided
-        Raises a clear KeyError / RuntimeError if not found.
-        """
-        if last_name:
-            return env[last_name]
-        
-        # Try common param names that legacy plans may use
-        table_name = params.get("table") or params.get("input")
-        if table_name:
-            if table_name not in env:
-                raise KeyError(f"Input table '{table_name}' not provided in input tables")
-            return env[table_name]
-        raise RuntimeError("No input available for legacy op (no previous result and no 'table'/'input' param)")
-
-    def _call_op_flexible(self, op_func: Callable, inputs: List[TensorTable], params: Dict) -> TensorTable:
-        """Call operator with flexible adapters to support both new and legacy op signatures.
-
-        Preferred operator signature:
-          op_func(inputs: List[TensorTable], params: Dict) -> TensorTable
-
-        Fallbacks tried in order:
-          - op_func(inputs, params)
-          - op_func(*inputs, **params)
-          - op_func(*inputs)
-        """
-        # Preferred: explicit list + params
-        try:
-            return op_func(inputs, params)
-        except TypeError:
-            pass
-
-        # Try positional expansion with params as kwargs
-        try:
-            return op_func(*inputs, **params)
-        except TypeError:
-            pass
-
-        # Try positional-only (legacy)
-        try:
-            return op_func(*inputs)
-        except TypeError as e:
-            # Provide a clearer error
-            raise TypeError(f"Operator call failed for {op_func}: {e}")
-
-    def execute(self, tables: Dict[str, TensorTable]) -> TensorTable:
-        """Execute plan using a named environment.
-
-        - `tables` provides initial named inputs available to the plan.
-        - Plan nodes populate `env` with named intermediates.
-        - Returns env['final'] if present, else the last produced result.
+        # Table name -> env slot
+        self._slots: Dict[str, int] = {}
+        # External input name -> op that first consumes it (for error messages)
+        self._required_inputs: Dict[str, str] = {}
+        self._last_output: str = ""
+        self._calls: List[Callable[[List[Optional[TensorTable]]], TensorTable]] = []
+        self._output_idx: List[int] = []
+        self._compile_plan(plan)
+
+    def _slot(self, name: str) -> int:
+        """Env slot of a table name, assigned on first use"""
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = self._slots[name] = len(self._slots)
+        return slot
+
+    def _compile_plan(self, plan: List[PlanElem]):
+        """Resolve every plan element into the operator/slot arrays.
 
         Raises clear exceptions on validation problems.
         """
-        if not self.plan:
-            raise ValueError("Empty execution plan")
-
-        # Environment of named tables/results: seed with input tables (copies of references)
-        env: Dict[str, TensorTable] = dict(tables)
+        produced = set()
 
         tmp_counter = 0
         last_name: str = ""  # name of last produced result
 
-        for elem in self.plan:
+        for elem in plan:
             # New-style node: dict with explicit inputs/outputs
             if isinstance(elem, dict):
                 op_name = elem.get("op")
                 op_func = elem.get("op_func")
-                inputs_names = elem.get("inputs", [])
+                inputs_names = list(elem.get("inputs", []))
                 output_name = elem.get("output")
                 params = elem.get("params", {})
 
                 if op_func is None:
                     raise ValueError(f"Plan node missing 'op_func': {elem}")
 
-                # Validate inputs exist
-                missing = [n for n in inputs_names if n not in env]
-                if missing:
-                    raise KeyError(f"Missing input(s) for node '{op_name}': {missing}")
-
-                inputs_vals = [env[n] for n in inputs_names]
-                result = self._call_op_flexible(op_func, inputs_vals, params)
+                if op_name == "scan" and len(inputs_names) == 1 and self._accepts(op_func, inputs_names[0], {}):
+                    # scan(table_name, tables): read the named input table
+                    call = self._bind_scan(op_func, inputs_names[0])
+                else:
+                    call = self._adapt_op(op_func, len(inputs_names), params)
 
                 if not output_name:
                     # assign generated name if output not provided
                     output_name = f"__tmp{tmp_counter}"
                     tmp_counter += 1
 
-                env[output_name] = result
-                last_name = output_name
-
             # Legacy-style tuple: (op_name, op_func, params)
             elif isinstance(elem, tuple) and len(elem) == 3:
-                print("elem = ", elem)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("legacy plan element: %s", elem)
                 op_name, op_func, params = elem
                 if not isinstance(params, dict):
                     raise ValueError(f"Legacy plan params must be a dict for op {op_name}")
@@ -139,84 +104,45 @@ class TQPExecutor:
                 tmp_counter += 1
 
                 if op_name == "scan":
-                    # resolve input from previous result or params['table']/['input']
-                    input_val = self._resolve_legacy_input(last_name, params, env)
-                    result = self._call_op_flexible(op_func, [input_val], params)
-                    # store under generated name as well (so downstream nodes can reference it if migrated)
-                    env[output_name] = result
-                    last_name = output_name
+                    table_name = params.get("table")
+                    if table_name and not last_name and self._accepts(op_func, table_name, {}):
+                        # scan(table_name, tables): the table is an external input
+                        inputs_names = [table_name]
+                        call = self._bind_scan(op_func, table_name)
+                    else:
+                        inputs_names = [self._resolve_legacy_input(last_name, params)]
+                        call = self._adapt_op(op_func, 1, params)
 
                 elif op_name == "filter":
-                    # resolve input from previous result or params['table']/['input']
-                    input_val = self._resolve_legacy_input(last_name, params, env)
+                    inputs_names = [self._resolve_legacy_input(last_name, params)]
                     # legacy filter signature: op_func(table, condition)
                     condition = params.get("condition")
                     if condition is None:
                         raise KeyError("filter params must include 'condition'")
-                    try:
-                        result = op_func(input_val, condition)
-                    except TypeError:
-                        # fallback to flexible adapter
-                        result = self._call_op_flexible(op_func, [input_val], params)
-                    env[output_name] = result
-                    last_name = output_name
+                    call = self._bind_legacy(op_func, inputs_names, [condition], params)
 
                 elif op_name == "project":
-                    input_val = self._resolve_legacy_input(last_name, params, env)
+                    inputs_names = [self._resolve_legacy_input(last_name, params)]
                     columns = params.get("columns")
                     if columns is None:
                         raise KeyError("project params must include 'columns'")
-                    try:
-                        result = op_func(input_val, columns)
-                    except TypeError:
-                        result = self._call_op_flexible(op_func, [input_val], params)
-                    env[output_name] = result
-                    last_name = output_name
+                    call = self._bind_legacy(op_func, inputs_names, [columns], params)
 
                 elif op_name == "sort":
-                    input_val = self._resolve_legacy_input(last_name, params, env)
+                    inputs_names = [self._resolve_legacy_input(last_name, params)]
                     key = params.get("key")
                     ascending = params.get("ascending", True)
                     if key is None:
                         raise KeyError("sort params must include 'key'")
-                    try:
-                        result = op_func(input_val, key, ascending)
-                    except TypeError:
-                        result = self._call_op_flexible(op_func, [input_val], params)
-                    env[output_name] = result
-                    last_name = output_name
+                    call = self._bind_legacy(op_func, inputs_names, [key, ascending], params)
 
                 elif op_name in ("sort_join", "hash_join"):
-                    # Legacy join relied on two sequential inputs: current_left then current_right.
-                    # We emulate that by remembering a special pending join slot in env.
-                    pending_key = "__pending_join"
-                    if pending_key not in env:
-                        # store left side
-                        if not last_name:
-                            raise RuntimeError(f"{op_name} left input missing")
-                        env[pending_key] = env[last_name]
-                        # do not produce a new tmp result yet; continue to next plan element
-                        # mark last_name as empty so next op is considered next input
-                        last_name = ""
-                    else:
-                        # have left, use current last_name as right
-                        if not last_name:
-                            raise RuntimeError(f"{op_name} right input missing")
-                        left = env.pop(pending_key)
-                        right = env[last_name]
-                        left_key = params.get("left_key")
-                        right_key = params.get("right_key")
-                        if left_key is None or right_key is None:
-                            raise KeyError(f"{op_name} params must include 'left_key' and 'right_key'")
-                        try:
-                            result = op_func(left, right, left_key, right_key)
-                        except TypeError:
-                            result = self._call_op_flexible(op_func, [left, right], params)
-                        env[output_name] = result
-                        last_name = output_name
+                    # A linear plan cannot say which earlier results are the join inputs
+                    raise ValueError(f"Legacy plans cannot express '{op_name}'; "
+                                     f"use a plan node with inputs=[left, right]")
 
                 elif op_name == "group_by":
-                    input_val = self._resolve_legacy_input(last_name, params, env)
+                    inputs_names = [self._resolve_legacy_input(last_name, params)]
                     agg_exprs = params.get("agg_exprs")
                     group_cols = params.get("group_cols")
                     if not agg_exprs or not isinstance(agg_exprs, list):
@@ -227,41 +153,172 @@ class TQPExecutor:
                     agg_fn = agg_expr.get("function")
                     if group_cols is None or agg_col is None or agg_fn is None:
                         raise KeyError("group_by params missing required keys")
-                    try:
-                        result = op_func(input_val, group_cols, agg_col, agg_fn)
-                    except TypeError:
-                        result = self._call_op_flexible(op_func, [input_val], params)
-                    env[output_name] = result
-                    last_name = output_name
+                    call = self._bind_legacy(op_func, inputs_names, [group_cols, agg_col, agg_fn], params)
 
                 else:
-                    # Generic fallback for unknown legacy op: attempt flexible call with last result as input if present
-                    inputs_vals = []
-                    if last_name:
-                        inputs_vals = [env[last_name]]
+                    # Generic fallback for unknown legacy op: flexible call with last result as input if present
+                    inputs_names = [last_name] if last_name else []
                     try:
-                        result = self._call_op_flexible(op_func, inputs_vals, params)
+                        call = self._adapt_op(op_func, len(inputs_names), params)
                     except TypeError as e:
                         raise TypeError(f"Failed to call legacy op '{op_name}': {e}")
-                    env[output_name] = result
-                    last_name = output_name
-
 
             else:
                 raise TypeError(f"Unsupported plan element type: {type(elem)}")
 
+            for name in inputs_names:
+                if name not in produced:
+                    self._required_inputs.setdefault(name, op_name)
+            input_slots = tuple(self._slot(name) for name in inputs_names)
+            self._calls.append(self._bind_slots(call, input_slots))
+            self._output_idx.append(self._slot(output_name))
+            produced.add(output_name)
+            last_name = output_name
+
+        self._last_output = last_name
+
+    def _resolve_legacy_input(self, last_name: str, params: Dict) -> str:
+        """Resolve the env name of the input for legacy-style ops.
+
+        Priority:
+          1. last_name (previous result) if set
+          2. params['table'] if provided (common for scan/filter emitted without a scan step)
+          3. params['input'] if provided
+        Raises a clear RuntimeError if not found.
+        """
+        if last_name:
+            return last_name
+
+        # Try common param names that legacy plans may use
+        table_name = params.get("table") or params.get("input")
+        if table_name:
+            return table_name
+        raise RuntimeError("No input available for legacy op (no previous result and no 'table'/'input' param)")
+
+    @staticmethod
+    def _accepts(op_func: Callable, *args, **kwargs) -> bool:
+        """Whether op_func's signature binds the given arguments (True if not inspectable)"""
+        try:
+            sig = inspect.signature(op_func)
+        except (TypeError, ValueError):
+            return True
+        try:
+            sig.bind(*args, **kwargs)
+        except TypeError:
+            return False
+        return True
+
+    def _adapt_op(self, op_func: Callable, n_inputs: int, params: Dict) -> Callable[..., TensorTable]:
+        """Resolve the calling convention of an operator once.
+
+        Returns a callable taking the input tables as positional arguments.
+
+        Preferred operator signature:
+          op_func(inputs: List[TensorTable], params: Dict) -> TensorTable
+        It is recognized by position, not name: exactly two positional
+        parameters, neither of them a key of params nor annotated TensorTable.
+
+        Otherwise, in order:
+          - op_func(*inputs, **params)  (params the signature does not name are dropped)
+          - op_func(*inputs)
+        """
+        try:
+            sig = inspect.signature(op_func)
+        except (TypeError, ValueError):
+            return lambda *inputs: op_func(list(inputs), params)
+
+        if self._takes_input_list(sig, params):
+            return lambda *inputs: op_func(list(inputs), params)
+
+        if any(p.kind == inspect.Parameter.VAR_KEYWORD for p in sig.parameters.values()):
+            kwargs = dict(params)
+        else:
+            kwargs = {k: v for k, v in params.items() if k in sig.parameters}
+
+        placeholders = [None] * n_inputs
+        if self._accepts(op_func, *placeholders, **kwargs):
+            return functools.partial(op_func, **kwargs) if kwargs else op_func
+        if self._accepts(op_func, *placeholders):
+            return op_func
+        raise TypeError(f"Operator {op_func} does not accept {n_inputs} input(s) with params {list(params)}")
+
+    @staticmethod
+    def _takes_input_list(sig: inspect.Signature, params: Dict) -> bool:
+        """Whether a signature is the (inputs, params) convention
+
+        Exactly two positional parameters, where neither receives a param by
+        name (e.g. filter(table, condition)) nor is annotated as a single
+        TensorTable (e.g. a binary op(left, right)).
+        """
+        positional = [p for p in sig.parameters.values()
+                      if p.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)]
+        if len(positional) != 2 or any(p.kind == inspect.Parameter.VAR_POSITIONAL
+                                       for p in sig.parameters.values()):
+            return False
+        return not any(p.name in params or p.annotation in (TensorTable, 'TensorTable') for p in positional)
+
+    def _bind_legacy(self, op_func: Callable, inputs_names: List[str], args: List[Any],
+                     params: Dict) -> Callable[..., TensorTable]:
+        """Bind a legacy op to its original positional convention, or the flexible adapter"""
+        if self._accepts(op_func, *inputs_names, *args):
+            return lambda *inputs: op_func(*inputs, *args)
+        return self._adapt_op(op_func, len(inputs_names), params)
+
+    @staticmethod
+    def _bind_scan(op_func: Callable, table_name: str) -> Callable[..., TensorTable]:
+        """Bind a scan(table_name, tables) operator to its resolved input table"""
+        return lambda table: op_func(table_name, {table_name: table})
+
+    @staticmethod
+    def _bind_slots(call: Callable[..., TensorTable],
+                    input_slots: Tuple[int, ...]) -> Callable[[List[Optional[TensorTable]]], TensorTable]:
+        """Close a call over the env slots of its inputs
+
+        Unary and binary nodes (all relational operators) get closures that
+        index env directly instead of building an argument list per execution.
+        """
+        if len(input_slots) == 1:
+            i0, = input_slots
+            return lambda env: call(env[i0])
+        if len(input_slots) == 2:
+            i0, i1 = input_slots
+            return lambda env: call(env[i0], env[i1])
+        return lambda env: call(*[env[i] for i in input_slots])
+
+    def execute(self, tables: Dict[str, TensorTable]) -> TensorTable:
+        """Execute plan using a named environment.
+
+        - `tables` provides initial named inputs available to the plan.
+        - Plan nodes populate `env` with intermediates (one slot per name).
+        - Returns env['final'] if present, else the last produced result.
+
+        Raises clear exceptions on validation problems.
+        """
+        if not self.plan:
+            raise ValueError("Empty execution plan")
+
+        # Validate inputs exist
+        for name, op_name in self._required_inputs.items():
+            if name not in tables:
+                missing = [n for n, op in self._required_inputs.items() if op == op_name and n not in tables]
+                raise KeyError(f"Missing input(s) for node '{op_name}': {missing}")
+
+        # Environment of tables/results indexed by slot: seed with input tables
+        env: List[Optional[TensorTable]] = [None] * len(self._slots)
+        for name in self._required_inputs:
+            env[self._slots[name]] = tables[name]
+
+        for call, output_slot in zip(self._calls, self._output_idx):
+            env[output_slot] = call(env)
+
         # Prefer explicitly named final result
-        if "final" in env:
-            return env["final"]
+        if "final" in self._slots:
+            return env[self._slots["final"]]
+        if "final" in tables:
+            return tables["final"]
 
-        if last_name and last_name in env:
-            return env[last_name]
+        if self._last_output:
+            return env[self._slots[self._last_output]]
 
         # Nothing produced
         raise RuntimeError("Plan executed but produced no results")
-
-"""
-plan =  [('filter', <function RelationalOperators.filter at 0x7d8a03635d00>, {'condition': Expression(expr_type=<ExprType.LT: 'lt'>, value=None, children=[Expression(expr_type=<ExprType.COLUMN: 'column'>, value='l_quantity', children=[]), Expression(expr_type=<ExprType.LITERAL: 'literal'>, value=24.0, children=[])])})]
-elem =  ('filter', <function RelationalOperators.filter at 0x7d8a03635d00>, {'condition': Expression(expr_type=<ExprType.LT: 'lt'>, value=None, children=[Expression(expr_type=<ExprType.COLUMN: 'column'>, value='l_quantity', children=[]), Expression(expr_type=<ExprType.LITERAL: 'literal'>, value=24.0, children=[])])})
----------------------------------------------------------------------------
-"""
\ No newline at end of file
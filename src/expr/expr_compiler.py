@@ -1,6 +1,10 @@
 from ir import ExprType, Expression
 from tensor import TensorTable
 
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
 import torch
 
 
@@ -21,23 +25,249 @@ class ExpressionCompiler:
         ExprType.OR: torch.logical_or,
     }
 
+    # EXPR_OPS indexed by ExprType.id (None for leaves)
+    EXPR_OP_TABLE = tuple(map(EXPR_OPS.get, ExprType))
+
+    # Tensor methods for `column <cmp> literal`, and the flipped op for `literal <cmp> column`
+    COMPARE_METHODS = {
+        ExprType.LT: torch.Tensor.lt,
+        ExprType.GT: torch.Tensor.gt,
+        ExprType.EQ: torch.Tensor.eq,
+        ExprType.LEQ: torch.Tensor.le,
+        ExprType.GEQ: torch.Tensor.ge,
+    }
+    FLIPPED_COMPARE = {
+        ExprType.LT: ExprType.GT,
+        ExprType.GT: ExprType.LT,
+        ExprType.EQ: ExprType.EQ,
+        ExprType.LEQ: ExprType.GEQ,
+        ExprType.GEQ: ExprType.LEQ,
+    }
+
+    # TorchScript spelling of EXPR_OPS, used when generating fused kernels
+    FUSED_OPS = {
+        ExprType.ADD: "torch.add",
+        ExprType.SUB: "torch.sub",
+        ExprType.MUL: "torch.mul",
+        ExprType.DIV: "torch.div",
+        ExprType.LT: "torch.lt",
+        ExprType.GT: "torch.gt",
+        ExprType.EQ: "torch.eq",
+        ExprType.LEQ: "torch.le",
+        ExprType.GEQ: "torch.ge",
+        ExprType.AND: "torch.logical_and",
+        ExprType.OR: "torch.logical_or",
+    }
+
+    # Scripted fused functions (None if not scriptable) keyed by generated body and
+    # literal types, least recently used first; bounded by FUSED_CACHE_SIZE
+    _fused_cache: 'OrderedDict[Hashable, Optional[Callable[..., torch.Tensor]]]' = OrderedDict()
+    FUSED_CACHE_SIZE = 256
+
+    # 0-d literal tensors keyed by (type, value, dtype, device), least recently
+    # used first; bounded by LITERAL_CACHE_SIZE. Entries are strong references:
+    # operators consume literals immediately, so weak ones would never be reused
+    _literal_cache: 'OrderedDict[Hashable, torch.Tensor]' = OrderedDict()
+    LITERAL_CACHE_SIZE = 256
+
     @staticmethod
     def compile(expr: Expression, table: TensorTable) -> torch.Tensor:
-        """Compile expression tree using post-order DFS traversal"""
-        if expr.expr_type == ExprType.COLUMN:
-            return table.get_column(expr.value)
+        """Compile expression tree using post-order DFS traversal
 
-        elif expr.expr_type == ExprType.LITERAL:
-            device = table.get_column(list(table.columns.keys())[0]).device
-            return torch.tensor([expr.value] * len(table), device=device)
+        The walk is iterative: an explicit stack of (node, expanded) pairs and a
+        stack of operand results. Literal operands are kept as Expressions until
+        their parent combines them, so they can take the dtype/device of the
+        sibling tensor.
+        """
+        # Fast path: `column <cmp> literal` is a single tensor-method call on a Python scalar
+        simple = ExpressionCompiler._simple_compare(expr)
+        if simple is not None:
+            method, column, value = simple
+            return method(table.get_column(column), value)
+
+        column_type, literal_type = ExprType.COLUMN, ExprType.LITERAL
+        op_table = ExpressionCompiler.EXPR_OP_TABLE
+        results: List[Union[torch.Tensor, Expression]] = []
+        stack = [(expr, False)]
+
+        while stack:
+            node, expanded = stack.pop()
+            expr_type = node.expr_type
+
+            if expr_type is column_type:
+                results.append(table.get_column(node.value))
+
+            elif expr_type is literal_type:
+                results.append(node)
+
+            elif not expanded:
+                if len(node.children) != 2:
+                    raise ValueError(f"Unsupported number of operands for {expr_type}")
+                # Post-order: evaluate children first, left before right
+                stack.append((node, True))
+                stack.append((node.children[1], False))
+                stack.append((node.children[0], False))
+
+            else:
+                right = results.pop()
+                left = results.pop()
+                if isinstance(left, Expression):
+                    left = ExpressionCompiler._literal_like(left.value, right, table, node.children[1])
+                if isinstance(right, Expression):
+                    right = ExpressionCompiler._literal_like(right.value, left, table, node.children[0])
+                # Apply corresponding tensor operation
+                results.append(op_table[expr_type.id](left, right))
+
+        result = results.pop()
+        if isinstance(result, Expression):
+            result = ExpressionCompiler._literal_like(result.value, None, table)
+        return result
+
+    @staticmethod
+    def _simple_compare(expr: Expression) -> Optional[Tuple[Callable, str, Any]]:
+        """(tensor method, column, scalar) if expr compares a column with a numeric literal"""
+        if expr.expr_type not in ExpressionCompiler.COMPARE_METHODS or len(expr.children) != 2:
+            return None
+        left, right = expr.children
+        expr_type = expr.expr_type
+        if left.expr_type == ExprType.LITERAL and right.expr_type == ExprType.COLUMN:
+            left, right = right, left
+            expr_type = ExpressionCompiler.FLIPPED_COMPARE[expr_type]
+        if left.expr_type != ExprType.COLUMN or right.expr_type != ExprType.LITERAL:
+            return None
+        if not isinstance(right.value, (int, float)):
+            return None
+        return ExpressionCompiler.COMPARE_METHODS[expr_type], left.value, right.value
+
+    @staticmethod
+    def _literal_like(value: Any, sibling: Optional[Union[torch.Tensor, Expression]],
+                      table: TensorTable, sibling_expr: Optional[Expression] = None) -> torch.Tensor:
+        """0-d literal typed after its sibling operand when that is a tensor
 
+        A floating sibling lends its dtype; an integral sibling does not, so
+        e.g. x < 2.5 is not truncated. 0-d tensors broadcast, so no column-sized
+        allocation is made. String literals are compared as codes of the
+        sibling dict_string column (see _string_code).
+        """
+        if isinstance(value, str):
+            value = ExpressionCompiler._string_code(value, sibling_expr, table)
+        if isinstance(sibling, torch.Tensor):
+            dtype = sibling.dtype if sibling.is_floating_point() else None
+            return ExpressionCompiler._literal(value, dtype, sibling.device)
+        return ExpressionCompiler._literal(value, None, table.device)
+
+    @staticmethod
+    def _string_code(value: str, sibling_expr: Optional[Expression], table: TensorTable) -> Union[int, float]:
+        """Dictionary code of a string literal compared with a dict_string column
+
+        Dictionaries are sorted, so codes order like the strings. A string
+        missing from the dictionary gets its insertion point minus 0.5, which
+        equals no code and orders correctly against all of them.
+        """
+        if (sibling_expr is None or sibling_expr.expr_type != ExprType.COLUMN
+                or sibling_expr.value not in table.dict_cols):
+            raise ValueError(f"String literal {value!r} can only be compared with a dict_string column")
+        uniques = table.dict_cols[sibling_expr.value]
+        code = bisect_left(uniques, value)
+        if code < len(uniques) and uniques[code] == value:
+            return code
+        return code - 0.5
+
+    @staticmethod
+    def _literal(value: Any, dtype: Optional[torch.dtype], device: torch.device) -> torch.Tensor:
+        """Cached 0-d tensor for a literal value"""
+        cache = ExpressionCompiler._literal_cache
+        key = (type(value), value, dtype, str(device))
+        literal = cache.get(key)
+        if literal is None:
+            literal = cache[key] = torch.as_tensor(value, dtype=dtype, device=device)
+            while len(cache) > ExpressionCompiler.LITERAL_CACHE_SIZE:
+                cache.popitem(last=False)
         else:
-            # Post-order: recursively evaluate children first
-            operands = [ExpressionCompiler.compile(child, table) for child in expr.children]
+            cache.move_to_end(key)
+        return literal
+
+    @staticmethod
+    def compile_fused(expr: Expression) -> Callable[[TensorTable], torch.Tensor]:
+        """Compile expression tree once into a single TorchScript function
+
+        The tree is walked once to generate the source of a function taking one
+        argument per referenced column and one per literal, so every element-wise
+        op runs inside one scripted graph instead of being dispatched (and
+        materialized) per node. Scripted functions are cached by structure
+        only: trees differing just in literal values share one kernel. Trees
+        TorchScript cannot express, and trees referencing no column (scalar
+        overloads would return a Python value, not a tensor), fall back to
+        eager `compile`.
+        """
+        simple = ExpressionCompiler._simple_compare(expr)
+        if simple is not None:
+            # A single comparison has nothing to fuse: call the tensor method directly
+            method, column, value = simple
+
+            def fused(table: TensorTable) -> torch.Tensor:
+                return method(table.get_column(column), value)
 
-            # Apply corresponding tensor operation
-            op_func = ExpressionCompiler.EXPR_OPS[expr.expr_type]
-            if len(operands) == 2:
-                return op_func(operands[0], operands[1])
+            return fused
+
+        columns: Dict[str, int] = {}
+        literals: List[Any] = []
+        body = ExpressionCompiler._emit_source(expr, columns, literals)
+        if body is None or not columns:
+            script_fn = None
+        else:
+            cache = ExpressionCompiler._fused_cache
+            key = (body, tuple(type(value).__name__ for value in literals))
+            if key in cache:
+                cache.move_to_end(key)
+                script_fn = cache[key]
             else:
-                raise ValueError(f"Unsupported number of operands for {expr.expr_type}")
+                args = [f"c{i}" for i in range(len(columns))]
+                args += [f"lit{i}: {type(value).__name__}" for i, value in enumerate(literals)]
+                source = f"def fused({', '.join(args)}):\n    return {body}\n"
+                try:
+                    script_fn = torch.jit.CompilationUnit(source).fused
+                except RuntimeError:
+                    script_fn = None
+                cache[key] = script_fn
+                while len(cache) > ExpressionCompiler.FUSED_CACHE_SIZE:
+                    cache.popitem(last=False)
+
+        if script_fn is None:
+            def fused(table: TensorTable) -> torch.Tensor:
+                return ExpressionCompiler.compile(expr, table)
+        else:
+            column_names: List[str] = list(columns)
+            literal_values = tuple(literals)
+
+            def fused(table: TensorTable) -> torch.Tensor:
+                return script_fn(*[table.get_column(name) for name in column_names], *literal_values)
+
+        return fused
+
+    @staticmethod
+    def _emit_source(expr: Expression, columns: Dict[str, int], literals: List[Any]) -> Optional[str]:
+        """Generate TorchScript source for an expression, or None if not expressible
+
+        Columns become arguments c<i> (one per distinct column) and literals
+        arguments lit<i> (one per occurrence, values appended to `literals`).
+        """
+        if expr.expr_type == ExprType.COLUMN:
+            index = columns.setdefault(expr.value, len(columns))
+            return f"c{index}"
+
+        elif expr.expr_type == ExprType.LITERAL:
+            # Only numeric scalars can be passed as int/float arguments
+            if isinstance(expr.value, bool) or not isinstance(expr.value, (int, float)):
+                return None
+            literals.append(expr.value)
+            return f"lit{len(literals) - 1}"
+
+        elif expr.expr_type in ExpressionCompiler.FUSED_OPS and len(expr.children) == 2:
+            left = ExpressionCompiler._emit_source(expr.children[0], columns, literals)
+            right = ExpressionCompiler._emit_source(expr.children[1], columns, literals)
+            if left is None or right is None:
+                return None
+            return f"{ExpressionCompiler.FUSED_OPS[expr.expr_type]}({left}, {right})"
+
+        return None
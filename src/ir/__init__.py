@@ -1,4 +1,4 @@
-from .ir import Expression, ExprType, OpType, IRNode
+from .ir import Expression, ExprType, OpType, IRNode, freeze
 from .optimizer import IROptimizer
 
 
@@ -7,5 +7,6 @@ __all__ = [
     "ExprType",
     "OpType",
     "IRNode",
+    "freeze",
     "IROptimizer",
 ]
@@ -1,6 +1,6 @@
 from enum import Enum
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Hashable, List, Optional, Sequence
 
 
 class OpType(Enum):
@@ -31,20 +31,25 @@ class ExprType(Enum):
     GEQ = "geq"
     AND = "and"
     OR = "or"
+
+    def __init__(self, value):
+        # Dense integer id in declaration order, for table-indexed dispatch
+        self.id = len(type(self).__members__)
     
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True, frozen=True)
 class Expression:
+    """Immutable (and hashable) expression tree node; children are stored as a tuple."""
     expr_type: ExprType
     value: Any = None
-    children: Optional[List['Expression']] = None
+    children: Optional[Sequence['Expression']] = None
 
     def __post_init__(self):
-        if self.children is None:
-            self.children = []
+        # Frozen: normalize through object.__setattr__
+        object.__setattr__(self, 'children', tuple(self.children) if self.children is not None else ())
 
 
-@dataclass
+@dataclass(slots=True)
 class IRNode:
     """TQP IR node representing a relational operator."""
     op_type: OpType
@@ -54,3 +59,24 @@ class IRNode:
     def __post_init__(self):
         if self.children is None:
             self.children = []
+
+    def structural_key(self) -> Hashable:
+        """Immutable key identifying the subtree by operator, params and children"""
+        return (
+            self.op_type,
+            freeze(self.params),
+            tuple(child.structural_key() for child in self.children),
+        )
+
+
+def freeze(value: Any) -> Hashable:
+    """Convert IR params (dicts, lists, Expressions) to a canonical hashable form"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(val)) for key, val in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(val) for val in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(val) for val in value)
+    if isinstance(value, Expression):
+        return (value.expr_type, freeze(value.value), tuple(freeze(child) for child in value.children))
+    return value
@@ -1,4 +1,6 @@
-from ir import IRNode, OpType
+from ir import IRNode, OpType, Expression, ExprType, freeze
+
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
 
 
 class IROptimizer:
@@ -9,10 +11,23 @@ class IROptimizer:
         # Example: Handle Spark's non-input projections from count(*) statements
         return self._remove_redundant_projections(ir)
 
-    def _remove_redundant_projections(self, node: IRNode) -> IRNode:
-        """Remove redundant projection operators"""
+    def _remove_redundant_projections(self, node: IRNode,
+                                      memo: Optional[Dict[int, Tuple[IRNode, IRNode]]] = None) -> IRNode:
+        """Remove redundant projection operators
+
+        `memo` maps id(node) to (node, rewrite) so subtrees shared by several
+        parents are visited once.
+        """
+        if memo is None:
+            memo = {}
+        cached = self._memo_lookup(memo, node)
+        if cached is not None:
+            return cached
+        # Register before recursing so a cyclic IR terminates
+        memo[id(node)] = (node, node)
+
         # Recursively process children
-        node.children = [self._remove_redundant_projections(child) for child in node.children]
+        self._rewrite_children(node, self._remove_redundant_projections, memo)
 
         # If this is a projection that projects all columns, remove it
         if node.op_type == OpType.PROJECT and len(node.children) == 1:
@@ -23,10 +38,217 @@ class IROptimizer:
 
         return node
 
+    @staticmethod
+    def _memo_lookup(memo: Dict[int, Tuple[IRNode, IRNode]], node: IRNode) -> Optional[IRNode]:
+        """Rewrite memoized for `node`, or None
+
+        Entries hold the original node so it stays alive: otherwise a node built
+        during the pass can reuse a replaced node's id and hit its stale entry.
+        """
+        entry = memo.get(id(node))
+        if entry is not None and entry[0] is node:
+            return entry[1]
+        return None
+
+    @staticmethod
+    def _rewrite_children(node: IRNode, rewrite: Callable[..., IRNode], *args):
+        """Apply a rewrite to each child, replacing in place only the children that change
+
+        No new children list is allocated and unchanged children keep their
+        identity, which preserves sharing for memoization and CSE.
+        """
+        children = node.children
+        for i, child in enumerate(children):
+            new_child = rewrite(child, *args)
+            if new_child is not child:
+                children[i] = new_child
+
     def optimize(self, ir: IRNode) -> IRNode:
         """Apply optimization rules"""
         # Example optimizations:
-        # - Predicate pushdown
         # - Join reordering
-        # - Filter merging
+        # Fold stacked filters first so pushdown sees every conjunct above a join,
+        # then again to fold pushed conjuncts into filters already on each side
+        ir = self._merge_filters(ir)
+        ir = self._push_down_predicates(ir)
+        ir = self._merge_filters(ir)
+        ir = self._eliminate_common_subexpressions(ir)
         return ir
+
+    def _eliminate_common_subexpressions(self, node: IRNode,
+                                         canonical: Optional[Dict[Hashable, IRNode]] = None,
+                                         memo: Optional[Dict[int, Tuple[IRNode, IRNode]]] = None) -> IRNode:
+        """Hash-cons the IR so structurally identical subtrees are one shared node
+
+        Nodes are keyed bottom-up by (op_type, canonical params, ids of canonical
+        children); the first node seen for a key becomes the instance every
+        duplicate is replaced with. The planner emits one plan node per instance.
+        """
+        if canonical is None:
+            canonical = {}
+        if memo is None:
+            memo = {}
+        cached = self._memo_lookup(memo, node)
+        if cached is not None:
+            return cached
+        memo[id(node)] = (node, node)
+
+        self._rewrite_children(node, self._eliminate_common_subexpressions, canonical, memo)
+
+        key = (node.op_type, freeze(node.params), tuple(id(child) for child in node.children))
+        result = canonical.setdefault(key, node)
+        memo[id(node)] = (node, result)
+        return result
+
+    def _push_down_predicates(self, node: IRNode, memo: Optional[Dict[int, Tuple[IRNode, IRNode]]] = None) -> IRNode:
+        """Push filter conjuncts over an inner join down to the side they reference
+
+        filter(join(L, R), p_l AND p_r AND p_lr) becomes
+        filter(join(filter(L, p_l), filter(R, p_r)), p_lr). Join outputs name
+        columns `left_<col>` / `right_<col>`; pushed conjuncts are rewritten to the
+        side's own column names.
+        """
+        if memo is None:
+            memo = {}
+        cached = self._memo_lookup(memo, node)
+        if cached is not None:
+            return cached
+        memo[id(node)] = (node, node)
+
+        self._rewrite_children(node, self._push_down_predicates, memo)
+
+        result = node
+        if node.op_type == OpType.FILTER and len(node.children) == 1 and self._is_inner_join(node.children[0]):
+            join = node.children[0]
+            left, right = join.children
+            left_cols = self._output_columns(left)
+            right_cols = self._output_columns(right)
+            if left_cols is not None and right_cols is not None:
+                left_preds, right_preds, kept = [], [], []
+                for conjunct in self._conjuncts(node.params['condition']):
+                    columns = self._referenced_columns(conjunct)
+                    if columns and all(c.startswith('left_') and c[len('left_'):] in left_cols for c in columns):
+                        left_preds.append(self._strip_column_prefix(conjunct, 'left_'))
+                    elif columns and all(c.startswith('right_') and c[len('right_'):] in right_cols for c in columns):
+                        right_preds.append(self._strip_column_prefix(conjunct, 'right_'))
+                    else:
+                        kept.append(conjunct)
+
+                if left_preds or right_preds:
+                    if left_preds:
+                        left = self._push_down_predicates(IRNode(
+                            op_type=OpType.FILTER,
+                            children=[left],
+                            params={'condition': self._conjoin(left_preds)}
+                        ), memo)
+                    if right_preds:
+                        right = self._push_down_predicates(IRNode(
+                            op_type=OpType.FILTER,
+                            children=[right],
+                            params={'condition': self._conjoin(right_preds)}
+                        ), memo)
+                    result = IRNode(op_type=join.op_type, children=[left, right], params=dict(join.params))
+                    if kept:
+                        result = IRNode(
+                            op_type=OpType.FILTER,
+                            children=[result],
+                            params={**node.params, 'condition': self._conjoin(kept)}
+                        )
+
+        memo[id(node)] = (node, result)
+        return result
+
+    @staticmethod
+    def _is_inner_join(node: IRNode) -> bool:
+        """Only inner joins allow pushing predicates to both sides"""
+        if node.op_type not in (OpType.HASH_JOIN, OpType.SORT_JOIN) or len(node.children) != 2:
+            return False
+        join_type = node.params.get('join_type')
+        return join_type is None or str(join_type).lower() == 'inner'
+
+    def _output_columns(self, node: IRNode) -> Optional[Set[str]]:
+        """Column names produced by a node, or None if they cannot be derived"""
+        if node.op_type == OpType.SCAN:
+            schema = node.params.get('schema')
+            return set(schema) if isinstance(schema, dict) else None
+        if node.op_type in (OpType.FILTER, OpType.SORT, OpType.LIMIT) and len(node.children) == 1:
+            return self._output_columns(node.children[0])
+        if node.op_type == OpType.PROJECT:
+            return set(node.params.get('columns', []))
+        if node.op_type in (OpType.HASH_JOIN, OpType.SORT_JOIN) and len(node.children) == 2:
+            left_cols = self._output_columns(node.children[0])
+            right_cols = self._output_columns(node.children[1])
+            if left_cols is None or right_cols is None:
+                return None
+            return {f'left_{c}' for c in left_cols} | {f'right_{c}' for c in right_cols}
+        if node.op_type == OpType.GROUP_BY:
+            group_cols = node.params.get('group_cols') or []
+            agg_exprs = node.params.get('agg_exprs') or []
+            return set(group_cols) | {f"{a.get('function')}_{a.get('column')}" for a in agg_exprs}
+        return None
+
+    @staticmethod
+    def _conjuncts(expr: Expression) -> List[Expression]:
+        """Split a predicate on AND boundaries"""
+        if expr.expr_type == ExprType.AND:
+            return [c for child in expr.children for c in IROptimizer._conjuncts(child)]
+        return [expr]
+
+    @staticmethod
+    def _conjoin(conjuncts: List[Expression]) -> Expression:
+        """AND a non-empty list of predicates together"""
+        result = conjuncts[0]
+        for conjunct in conjuncts[1:]:
+            result = Expression(expr_type=ExprType.AND, children=[result, conjunct])
+        return result
+
+    @staticmethod
+    def _referenced_columns(expr: Expression) -> Set[str]:
+        """Names of all columns an expression reads"""
+        if expr.expr_type == ExprType.COLUMN:
+            return {expr.value}
+        return {c for child in expr.children for c in IROptimizer._referenced_columns(child)}
+
+    @staticmethod
+    def _strip_column_prefix(expr: Expression, prefix: str) -> Expression:
+        """Copy of an expression with `prefix` removed from column names"""
+        if expr.expr_type == ExprType.COLUMN:
+            return Expression(expr_type=ExprType.COLUMN, value=expr.value[len(prefix):])
+        return Expression(
+            expr_type=expr.expr_type,
+            value=expr.value,
+            children=[IROptimizer._strip_column_prefix(child, prefix) for child in expr.children]
+        )
+
+    def _merge_filters(self, node: IRNode, memo: Optional[Dict[int, Tuple[IRNode, IRNode]]] = None) -> IRNode:
+        """Fold filter(filter(x, p1), p2) into filter(x, p2 AND p1)
+
+        The combined predicate is evaluated in one pass instead of materializing
+        an intermediate mask and table per filter.
+        """
+        if memo is None:
+            memo = {}
+        cached = self._memo_lookup(memo, node)
+        if cached is not None:
+            return cached
+        memo[id(node)] = (node, node)
+
+        # Bottom-up: stacked filters below are already folded into one
+        self._rewrite_children(node, self._merge_filters, memo)
+
+        result = node
+        if node.op_type == OpType.FILTER and len(node.children) == 1:
+            inner = node.children[0]
+            if inner.op_type == OpType.FILTER and len(inner.children) == 1:
+                condition = Expression(
+                    expr_type=ExprType.AND,
+                    children=[node.params['condition'], inner.params['condition']]
+                )
+                result = IRNode(
+                    op_type=OpType.FILTER,
+                    children=[inner.children[0]],
+                    params={**node.params, 'condition': condition}
+                )
+
+        memo[id(node)] = (node, result)
+        return result
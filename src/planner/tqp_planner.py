@@ -1,13 +1,24 @@
 from ir import IRNode, OpType
+from expr import ExpressionCompiler
 from relational_operator import RelationalOperators
+from executor import TQPExecutor
+from tensor import TensorTable
 
-from typing import Callable, Dict, List, Tuple
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import torch
 
 
 class TQPPlanner:
     """Transforms IR graph to operator plan (tensor programs)"""
 
-    def __init__(self):
+    # Compiled pipelines kept, least recently used evicted first
+    PIPELINE_CACHE_SIZE = 64
+    # Compiled variants kept per pipeline, one per distinct set of input string dictionaries
+    PIPELINE_VARIANTS = 8
+
+    def __init__(self, device: Optional[str] = None):
         # Dictionary mapping operators to tensor program implementations
         self.operator_dict = {
             OpType.FILTER: RelationalOperators.filter,
@@ -18,23 +29,206 @@ class TQPPlanner:
             OpType.GROUP_BY: RelationalOperators.group_by,
             OpType.SCAN: RelationalOperators.scan,
         }
+        # id(IR node) -> number of parents, for the plan being built
+        self._consumers: Dict[int, int] = {}
+        # Device joins run on (None: wherever their inputs are)
+        self.device = device
+        # Compiled pipelines keyed by (IR structural key, input table layouts),
+        # least recently used first; bounded by PIPELINE_CACHE_SIZE
+        self._pipeline_cache: 'OrderedDict[Hashable, Callable[[Dict[str, TensorTable]], TensorTable]]' = OrderedDict()
 
-    def plan(self, ir: IRNode) -> List[Tuple[str, Callable, Dict]]:
-        """Convert IR graph to operator plan"""
+    def plan(self, ir: IRNode) -> List[Dict[str, Any]]:
+        """Convert IR graph to operator plan of explicit nodes (see TQPExecutor)"""
         plan = []
-        self._build_plan(ir, plan)
+        self._consumers = {}
+        self._count_consumers(ir, set())
+        self._build_plan(ir, plan, {})
         return plan
 
-    def _build_plan(self, node: IRNode, plan: List):
-        """Build plan via DFS post-order traversal"""
-        # Process children first
+    def compile_pipeline(self, ir: IRNode,
+                         tables: Dict[str, TensorTable]) -> Callable[[Dict[str, TensorTable]], TensorTable]:
+        """Run the plan for ir through torch.compile over flat column tensors
+
+        The compiled function takes the column tensors of the scanned tables as
+        positional arguments and returns the result columns as a tuple. Inside
+        it the plan still runs through TQPExecutor, so Dynamo breaks the graph
+        at every data-dependent op (nonzero, repeat_interleave, row-count
+        branches): the result is a chain of compiled regions, not one fused
+        kernel. `tables` fixes the input schemas. String dictionaries are read
+        from the inputs of every call; since they are Python data, each
+        distinct set gets its own compiled variant (see _pipeline_variant),
+        PIPELINE_VARIANTS at most, selected by each input's TensorTable.dict_key.
+        """
+        key = (ir.structural_key(),
+               tuple((name, tuple(t.schema.items())) for name, t in sorted(tables.items())))
+        pipeline = self._pipeline_cache.get(key)
+        if pipeline is not None:
+            self._pipeline_cache.move_to_end(key)
+            return pipeline
+
+        plan = self.plan(ir)
+        executor = TQPExecutor(plan)
+        scan_names = list(dict.fromkeys(node["inputs"][0] for node in plan if node["op"] == "scan"))
+        layouts = [(name, tables[name].schema) for name in scan_names]
+        # Variants by the content of the inputs' string dictionaries, least recently used first
+        variants: 'OrderedDict[Hashable, Callable[[List[torch.Tensor]], TensorTable]]' = OrderedDict()
+
+        def pipeline(inputs: Dict[str, TensorTable]) -> TensorTable:
+            tensors = [inputs[name].columns[col] for name, schema in layouts for col in schema]
+            dicts_key = tuple(inputs[name].dict_key for name, _ in layouts)
+            variant = variants.get(dicts_key)
+            if variant is None:
+                dicts = [inputs[name].dict_cols for name, _ in layouts]
+                variant = variants[dicts_key] = self._pipeline_variant(executor, layouts, dicts)
+                while len(variants) > self.PIPELINE_VARIANTS:
+                    variants.popitem(last=False)
+            else:
+                variants.move_to_end(dicts_key)
+            return variant(tensors)
+
+        self._pipeline_cache[key] = pipeline
+        while len(self._pipeline_cache) > self.PIPELINE_CACHE_SIZE:
+            self._pipeline_cache.popitem(last=False)
+        return pipeline
+
+    @staticmethod
+    def _pipeline_variant(executor: TQPExecutor, layouts: List[Tuple[str, Dict[str, str]]],
+                          dicts: List[Dict[str, List[str]]]) -> Callable[[List[torch.Tensor]], TensorTable]:
+        """Pipeline over flat column tensors for one set of input string dictionaries
+
+        Runs eagerly until a non-empty result records the result layout (column
+        names, schema, dictionaries), then through torch.compile. If compiling
+        fails, the variant stays eager.
+        """
+        def run_tables(*tensors: torch.Tensor) -> TensorTable:
+            columns = iter(tensors)
+            inputs = {name: TensorTable({col: next(columns) for col in schema}, schema, dict_cols)
+                      for (name, schema), dict_cols in zip(layouts, dicts)}
+            return executor.execute(inputs)
+
+        def run(*tensors: torch.Tensor):
+            return tuple(run_tables(*tensors).columns.values())
+
+        compiled = None
+        output = None
+
+        def variant(tensors: List[torch.Tensor]) -> TensorTable:
+            nonlocal compiled, output
+            if output is None:
+                # Eager: joins without matches return an empty table, which has no layout
+                result = run_tables(*tensors)
+                if result.columns:
+                    output = (list(result.columns), result.schema, result.dict_cols)
+                    if hasattr(torch, 'compile'):
+                        try:
+                            compiled = torch.compile(run, dynamic=True)
+                        except RuntimeError:
+                            # torch.compile unsupported here (e.g. Dynamo on this Python version)
+                            compiled = None
+                return result
+
+            result_columns = None
+            if compiled is not None:
+                try:
+                    result_columns = compiled(*tensors)
+                except RuntimeError:
+                    # No working compiler backend: stay eager
+                    compiled = None
+            if result_columns is None:
+                result_columns = run(*tensors)
+            if not result_columns:
+                return TensorTable({}, {})
+            names, schema, dict_cols = output
+            return TensorTable(dict(zip(names, result_columns)), schema, dict_cols)
+
+        return variant
+
+    def _count_consumers(self, node: IRNode, visited: set):
+        """Count the parents of every IR node (shared after CSE)"""
+        if id(node) in visited:
+            return
+        visited.add(id(node))
         for child in node.children:
-            self._build_plan(child, plan)
+            self._consumers[id(child)] = self._consumers.get(id(child), 0) + 1
+            self._count_consumers(child, visited)
+
+    def _build_plan(self, node: IRNode, plan: List, memo: Dict[int, str]) -> str:
+        """Build plan via DFS post-order traversal
+
+        Returns the name of the env entry holding the node's result. `memo` maps
+        id(node) to that name, so an IR node shared by several parents (see
+        IROptimizer CSE) is planned, and executed, once.
+        """
+        if id(node) in memo:
+            return memo[id(node)]
+
+        # Scans read the input table of the same name
+        if node.op_type == OpType.SCAN:
+            inputs = [node.params['table']]
+        elif self._is_fusable_filter_project(node):
+            # project(filter(x)): one fused op that only gathers projected columns
+            filter_node = node.children[0]
+            inputs = [self._build_plan(child, plan, memo) for child in filter_node.children]
+            output = f"filter_project_{len(plan)}"
+            plan.append({
+                "op": "filter_project",
+                "op_func": RelationalOperators.filter_project,
+                "inputs": inputs,
+                "output": output,
+                "params": {**self._op_params(filter_node), 'columns': node.params['columns']},
+            })
+            memo[id(node)] = output
+            return output
+        else:
+            # Process children first
+            inputs = [self._build_plan(child, plan, memo) for child in node.children]
 
         # Fetch corresponding tensor program from dictionary
-        if node.op_type in self.operator_dict:
-            plan.append((
-                node.op_type.value,
-                self.operator_dict[node.op_type],
-                node.params
-            ))
+        if node.op_type not in self.operator_dict:
+            # No tensor program (e.g. limit): pass the child result through
+            memo[id(node)] = inputs[0] if inputs else ""
+            return memo[id(node)]
+
+        output = f"{node.op_type.value}_{len(plan)}"
+        plan.append({
+            "op": node.op_type.value,
+            "op_func": self.operator_dict[node.op_type],
+            "inputs": inputs,
+            "output": output,
+            "params": self._op_params(node),
+        })
+        memo[id(node)] = output
+        return output
+
+    def _is_fusable_filter_project(self, node: IRNode) -> bool:
+        """project over a filter that nothing else consumes"""
+        if node.op_type != OpType.PROJECT or len(node.children) != 1:
+            return False
+        child = node.children[0]
+        return (child.op_type == OpType.FILTER
+                and len(child.children) == 1
+                and self._consumers.get(id(child), 0) == 1)
+
+    def _op_params(self, node: IRNode) -> Dict:
+        """Operator keyword arguments for a node
+
+        Filter predicates are pre-compiled to fused kernels; IR params whose names
+        differ from the operator's arguments are renamed.
+        """
+        if node.op_type == OpType.FILTER and 'condition' in node.params:
+            params = dict(node.params)
+            params['condition'] = ExpressionCompiler.compile_fused(node.params['condition'])
+            return params
+        if node.op_type == OpType.SORT:
+            return {'key_column': node.params['key'], 'ascending': node.params.get('ascending', True)}
+        if node.op_type == OpType.GROUP_BY:
+            # Operators evaluate a single aggregate: the first one
+            agg_expr = node.params['agg_exprs'][0]
+            return {
+                'group_cols': node.params['group_cols'],
+                'agg_col': agg_expr['column'],
+                'agg_func': agg_expr['function'],
+            }
+        if node.op_type in (OpType.SORT_JOIN, OpType.HASH_JOIN) and self.device is not None:
+            return {**node.params, 'device': self.device}
+        return node.params
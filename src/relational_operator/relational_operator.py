@@ -3,12 +3,51 @@ from tensor import TensorTable
 from ir import Expression
 from expr import ExpressionCompiler
 
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+
+# Per-group aggregates over rows sorted by group: (sorted_agg_col, group_counts) -> aggregate.
+# Groups are contiguous runs of group_counts rows, so segment_reduce needs no scatter atomics.
+def _sum_group(sorted_agg_col: torch.Tensor, group_counts: torch.Tensor) -> torch.Tensor:
+    return torch.segment_reduce(sorted_agg_col, 'sum', lengths=group_counts)
+
+
+def _count_group(sorted_agg_col: torch.Tensor, group_counts: torch.Tensor) -> torch.Tensor:
+    return group_counts.to(torch.float32)
+
+
+def _avg_group(sorted_agg_col: torch.Tensor, group_counts: torch.Tensor) -> torch.Tensor:
+    return torch.segment_reduce(sorted_agg_col, 'mean', lengths=group_counts)
+
+
+def _min_group(sorted_agg_col: torch.Tensor, group_counts: torch.Tensor) -> torch.Tensor:
+    return torch.segment_reduce(sorted_agg_col, 'min', lengths=group_counts)
+
+
+def _max_group(sorted_agg_col: torch.Tensor, group_counts: torch.Tensor) -> torch.Tensor:
+    return torch.segment_reduce(sorted_agg_col, 'max', lengths=group_counts)
 
 
 class RelationalOperators:
     """Tensor implementations of relational operators"""
 
+    # Eager per-group aggregate functions by agg_func name
+    AGG_FUNCS = {
+        'sum': _sum_group,
+        'count': _count_group,
+        'avg': _avg_group,
+        'min': _min_group,
+        'max': _max_group,
+    }
+
+    # torch.compile'd aggregates by agg_func name (eager functions once compilation failed)
+    _agg_cache: Dict[str, Callable[[torch.Tensor, torch.Tensor], torch.Tensor]] = {}
+
+    # Left rows probed per block by the broadcast-equality join probe
+    JOIN_BLOCK_ROWS = 4096
+    # Joins with at most this many left x right key pairs use the broadcast probe
+    BROADCAST_JOIN_MAX_CELLS = 1 << 16
+
     @staticmethod
     def scan(table_name: str, tables: Dict[str, TensorTable]) -> TensorTable:
         """Scan operation - loads table data into tensor format
@@ -19,198 +58,456 @@ class RelationalOperators:
         return tables[table_name]
     
     @staticmethod
-    def filter(table: TensorTable, condition: Expression) -> TensorTable:
-        """Filter operation using boolean mask (bitmap-based)"""
-        # Compile condition to boolean tensor mask
-        mask = ExpressionCompiler.compile(condition, table)
+    def filter(table: TensorTable,
+               condition: Union[Expression, Callable[[TensorTable], torch.Tensor]]) -> TensorTable:
+        """Filter operation using boolean mask (bitmap-based)
+
+        `condition` is either an Expression tree or a fused predicate produced by
+        ExpressionCompiler.compile_fused.
+        """
+        mask = RelationalOperators._evaluate_condition(table, condition)
+        return RelationalOperators._select_rows(table, mask, list(table.columns))
+
+    @staticmethod
+    def filter_project(table: TensorTable,
+                       condition: Union[Expression, Callable[[TensorTable], torch.Tensor]],
+                       columns: List[str]) -> TensorTable:
+        """Fused filter + project: evaluate the predicate, then gather only projected columns
+
+        Emitted by the planner for project(filter(x)) so columns dropped by the
+        projection are never materialized.
+        """
+        mask = RelationalOperators._evaluate_condition(table, condition)
+        return RelationalOperators._select_rows(table, mask, columns)
+
+    @staticmethod
+    def _evaluate_condition(table: TensorTable,
+                            condition: Union[Expression, Callable[[TensorTable], torch.Tensor]]) -> torch.Tensor:
+        """Compile condition to boolean tensor mask"""
+        if isinstance(condition, Expression):
+            return ExpressionCompiler.compile(condition, table)
+        return condition(table)
+
+    @staticmethod
+    def _select_rows(table: TensorTable, mask: torch.Tensor, columns: List[str]) -> TensorTable:
+        """Apply a boolean row mask to the given columns
+
+        The mask is turned into row positions once; every column (1D or 2D
+        string) is then a single index_select along dim 0 with that index.
+        A 0-d mask (a predicate over literals only) applies to every row.
+        """
+        if mask.dim() == 0:
+            mask = mask.expand(table.num_rows)
+        positions = torch.nonzero(mask, as_tuple=False).squeeze(1)
+
+        if positions.numel() == mask.numel():
+            # All rows pass: no gathers needed
+            return RelationalOperators.project(table, columns)
 
-        # Apply mask to all columns using torch.masked_select
         filtered_columns = {}
-        for col_name, col_tensor in table.columns.items():
-            if table.schema[col_name] == 'string':
-                # Handle 2D string tensors
-                filtered_columns[col_name] = col_tensor[mask]
-            else:
-                filtered_columns[col_name] = torch.masked_select(col_tensor, mask)
+        if positions.numel() == 0:
+            # No rows pass: empty views, no gathers launched
+            for col_name in columns:
+                filtered_columns[col_name] = table.columns[col_name][:0]
+        else:
+            for col_name in columns:
+                filtered_columns[col_name] = table.columns[col_name].index_select(0, positions)
 
-        return TensorTable(filtered_columns, table.schema)
+        filtered_schema = {col_name: table.schema[col_name] for col_name in columns}
+        # Rows keep their relative order
+        return TensorTable._from_validated(filtered_columns, filtered_schema,
+                                           positions.numel() if columns else 0,
+                                           RelationalOperators._select_dicts(table, columns),
+                                           RelationalOperators._kept_sort(table, columns))
 
     @staticmethod
     def project(table: TensorTable, columns: List[str]) -> TensorTable:
-        """Project (select) specific columns"""
-        projected_columns = {col: table.columns[col] for col in columns}
-        projected_schema = {col: table.schema[col] for col in columns}
-        return TensorTable(projected_columns, projected_schema)
+        """Project (select) specific columns
+
+        Column tensors are shared with the input, never copied. Projecting every
+        column in its existing order returns the input table itself; otherwise
+        columns, schema and dictionaries are collected in one pass over the
+        kept columns.
+        """
+        if len(columns) == len(table.columns) and all(a == b for a, b in zip(columns, table.columns)):
+            return table
+
+        table_columns, table_schema, table_dicts = table.columns, table.schema, table.dict_cols
+        projected_columns = {}
+        projected_schema = {}
+        projected_dicts = {}
+        for col in columns:
+            projected_columns[col] = table_columns[col]
+            projected_schema[col] = table_schema[col]
+            if col in table_dicts:
+                projected_dicts[col] = table_dicts[col]
+        return TensorTable._from_validated(projected_columns, projected_schema,
+                                           table.num_rows if columns else 0,
+                                           projected_dicts,
+                                           RelationalOperators._kept_sort(table, columns))
+
+    @staticmethod
+    def _kept_sort(table: TensorTable, columns: List[str]) -> Optional[str]:
+        """table.sorted_by if that column is among the kept columns"""
+        return table.sorted_by if table.sorted_by in columns else None
+
+    @staticmethod
+    def _select_dicts(table: TensorTable, columns: List[str]) -> Dict[str, List[str]]:
+        """String dictionaries of the given columns"""
+        return {col: table.dict_cols[col] for col in columns if col in table.dict_cols}
+
+    @staticmethod
+    def _join_dicts(left: TensorTable, right: TensorTable) -> Dict[str, List[str]]:
+        """String dictionaries of a join result, under its left_/right_ column names"""
+        dict_cols = {f"left_{col}": uniques for col, uniques in left.dict_cols.items()}
+        dict_cols.update({f"right_{col}": uniques for col, uniques in right.dict_cols.items()})
+        return dict_cols
+
+    @staticmethod
+    def _join_keys(left: TensorTable, right: TensorTable,
+                   left_key: str, right_key: str) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Join key columns, with dictionary codes of the right side recoded into the left dictionary"""
+        left_keys = left.get_column(left_key)
+        right_keys = right.get_column(right_key)
+
+        if RelationalOperators._recodes_join_keys(left, right, left_key, right_key):
+            # Strings missing from the left dictionary get -1, which matches no code
+            index = {s: i for i, s in enumerate(left.dict_cols[left_key])}
+            right_dict = right.dict_cols[right_key]
+            recode = torch.tensor([index.get(s, -1) for s in right_dict],
+                                  dtype=left_keys.dtype, device=right_keys.device)
+            right_keys = recode[right_keys.long()]
+        return left_keys, right_keys
+
+    @staticmethod
+    def _recodes_join_keys(left: TensorTable, right: TensorTable, left_key: str, right_key: str) -> bool:
+        """Whether the right join keys are dictionary codes that must be recoded (see _join_keys)"""
+        left_dict = left.dict_cols.get(left_key)
+        right_dict = right.dict_cols.get(right_key)
+        return left_dict is not None and right_dict is not None and left_dict is not right_dict
+
+    @staticmethod
+    def _sorted_keys(keys: torch.Tensor, presorted: bool) -> Tuple[torch.Tensor, torch.Tensor]:
+        """(sorted keys, permutation); keys known to be in ascending order are not re-sorted"""
+        if presorted:
+            return keys, torch.arange(len(keys), device=keys.device)
+        return torch.sort(keys, stable=True)
 
     @staticmethod
     def sort(table: TensorTable, key_column: str, ascending: bool = True) -> TensorTable:
-        """Sort table by key column"""
+        """Sort table by key column
+
+        Ascending results are marked sorted_by=key_column; a table already
+        marked so is returned unchanged.
+        """
+        if ascending and table.sorted_by == key_column:
+            return table
+
         key_tensor = table.get_column(key_column)
 
-        # Get sort indices
-        sorted_indices = torch.argsort(key_tensor, descending=not ascending)
+        # Sorted keys and permutation in one pass (radix sort for integer keys on CUDA)
+        sorted_keys, sorted_indices = torch.sort(key_tensor, descending=not ascending, stable=True)
 
-        # Reorder all columns
+        # Reorder all columns; the key column is already sorted
         sorted_columns = {}
         for col_name, col_tensor in table.columns.items():
-            sorted_columns[col_name] = col_tensor[sorted_indices]
+            if col_name == key_column:
+                sorted_columns[col_name] = sorted_keys
+            else:
+                sorted_columns[col_name] = col_tensor[sorted_indices]
 
-        return TensorTable(sorted_columns, table.schema)
+        return TensorTable._from_validated(sorted_columns, table.schema, table.num_rows, table.dict_cols,
+                                           key_column if ascending else None)
 
     @staticmethod
     def sort_merge_join(left: TensorTable, right: TensorTable,
-                        left_key: str, right_key: str) -> TensorTable:
+                        left_key: str, right_key: str,
+                        device: Optional[Union[str, torch.device]] = None) -> TensorTable:
         """Sort-merge join with late materialization strategy
 
-        Uses: torch.argsort, torch.bincount, torch.cumsum, torch.bucketize
-        """
-        # Get join keys
-        left_keys = left.get_column(left_key)
-        right_keys = right.get_column(right_key)
-
-        # Sort both sides
-        left_sorted_idx = torch.argsort(left_keys)
-        right_sorted_idx = torch.argsort(right_keys)
-
-        left_sorted = left_keys[left_sorted_idx]
-        right_sorted = right_keys[right_sorted_idx]
+        Uses: torch.sort, torch.searchsorted, torch.repeat_interleave
 
-        # Build histograms using bincount to count occurrences of unique keys
-        all_keys = torch.cat([left_sorted, right_sorted])
-        unique_keys = torch.unique(all_keys)
+        If `device` is given, both inputs are moved there first (see _join_inputs).
+        A side whose table is sorted_by its join key is not sorted again; the
+        result is sorted by the left key.
+        """
+        # Recoded dictionary codes are no longer in the order of the right table
+        right_presorted = (right.sorted_by == right_key
+                           and not RelationalOperators._recodes_join_keys(left, right, left_key, right_key))
+        left_presorted = left.sorted_by == left_key
 
-        # Use bucketize for parallel binary search
-        # left_buckets
-        _ = torch.bucketize(left_sorted, unique_keys, right=False)
-        # right_buckets
-        _ = torch.bucketize(right_sorted, unique_keys, right=False)
+        # Get join keys; the right side is sorted as soon as it is on the device
+        left, right, left_keys, (right_sorted, right_sorted_idx) = RelationalOperators._join_inputs(
+            left, right, left_key, right_key, device,
+            lambda keys: RelationalOperators._sorted_keys(keys, right_presorted))
 
-        # Build output indices (late materialization)
-        output_left_idx = []
-        output_right_idx = []
+        # Sort the left side: sorted keys and permutation in one pass
+        left_sorted, left_sorted_idx = RelationalOperators._sorted_keys(left_keys, left_presorted)
 
-        for i in range(len(left_sorted)):
-            matches = (right_sorted == left_sorted[i]).nonzero(as_tuple=True)[0]
-            for match in matches:
-                output_left_idx.append(left_sorted_idx[i].item())
-                output_right_idx.append(right_sorted_idx[match].item())
+        # Build output indices (late materialization): binary-search each sorted
+        # left key in the sorted right keys
+        left_pos, output_right_idx = RelationalOperators._probe_sorted(left_sorted, right_sorted, right_sorted_idx)
+        output_left_idx = left_sorted_idx[left_pos]
 
-        if not output_left_idx:
+        if output_left_idx.numel() == 0:
             return TensorTable({}, {})
 
         # Materialize result
-        result_columns = {}
-        result_schema = {}
-
-        output_left_idx = torch.tensor(output_left_idx, device=left_keys.device)
-        output_right_idx = torch.tensor(output_right_idx, device=right_keys.device)
-
-        for col_name, col_tensor in left.columns.items():
-            result_columns[f"left_{col_name}"] = col_tensor[output_left_idx]
-            result_schema[f"left_{col_name}"] = left.schema[col_name]
-
-        for col_name, col_tensor in right.columns.items():
-            result_columns[f"right_{col_name}"] = col_tensor[output_right_idx]
-            result_schema[f"right_{col_name}"] = right.schema[col_name]
-
-        return TensorTable(result_columns, result_schema)
+        return RelationalOperators._materialize(left, right, output_left_idx, output_right_idx,
+                                                f"left_{left_key}")
 
     @staticmethod
     def hash_join(left: TensorTable, right: TensorTable,
-                  left_key: str, right_key: str) -> TensorTable:
-        """Hash join with interleaved build/probe phases
+                  left_key: str, right_key: str,
+                  device: Optional[Union[str, torch.device]] = None) -> TensorTable:
+        """Hash join with build/probe phases
+
+        Build: sort the right keys (stable) into a sorted table with its
+        permutation. Probe: torch.searchsorted gives every left key its range of
+        matches, expanded with repeat_interleave - O((n+m) log m), no n x m
+        match matrix. Tiny inputs, where launch overhead dominates, use a single
+        broadcast-equality probe instead.
 
-        Uses scatter_ for building hash table and probing
+        If `device` is given, both inputs are moved there first (see _join_inputs).
         """
-        left_keys = left.get_column(left_key)
-        right_keys = right.get_column(right_key)
+        broadcast = len(left) * len(right) <= RelationalOperators.BROADCAST_JOIN_MAX_CELLS
+        if broadcast:
+            build = lambda keys: (keys,)
+        else:
+            build = lambda keys: torch.sort(keys, stable=True)
+        left, right, left_keys, built = RelationalOperators._join_inputs(
+            left, right, left_key, right_key, device, build)
 
-        # Generate hash values (simplified - use modulo for demo)
-        hash_size = max(len(left_keys), len(right_keys))
-        # FIXME: right_hashes - we may have to ultilize it
-        _ = (right_keys % hash_size).long()
+        if broadcast:
+            output_left_idx, output_right_idx = RelationalOperators._probe_broadcast(left_keys, *built)
+        else:
+            output_left_idx, output_right_idx = RelationalOperators._probe_sorted(left_keys, *built)
 
-        # Build phase: create hash table from right table using scatter_
-        # Probe phase: find matches
-        output_left_idx = []
-        output_right_idx = []
+        if output_left_idx.numel() == 0:
+            return TensorTable({}, {})
 
-        for i in range(len(left_keys)):
-            matches = (right_keys == left_keys[i]).nonzero(as_tuple=True)[0]
-            for match in matches:
-                output_left_idx.append(i)
-                output_right_idx.append(match.item())
+        # Materialize: output rows follow left row order
+        sorted_by = f"left_{left.sorted_by}" if left.sorted_by is not None else None
+        return RelationalOperators._materialize(left, right, output_left_idx, output_right_idx, sorted_by)
 
-        if not output_left_idx:
-            return TensorTable({}, {})
+    @staticmethod
+    def _join_inputs(left: TensorTable, right: TensorTable, left_key: str, right_key: str,
+                     device: Optional[Union[str, torch.device]],
+                     build: Callable[[torch.Tensor], Tuple[torch.Tensor, ...]]
+                     ) -> Tuple[TensorTable, TensorTable, torch.Tensor, Tuple[torch.Tensor, ...]]:
+        """Join inputs on the target device, the left keys and the build side built from the right keys
+
+        Returns (left, right, left_keys, build(right_keys)). When moving to a
+        CUDA device, the right (build) side is copied and built on one stream
+        while the left (probe) side is copied on another, so the probe-side
+        transfer overlaps the build; copies from pinned memory are asynchronous.
+        """
+        if device is None:
+            left_keys, right_keys = RelationalOperators._join_keys(left, right, left_key, right_key)
+            return left, right, left_keys, build(right_keys)
+
+        device = torch.device(device)
+        if device.type != 'cuda':
+            left = RelationalOperators._to_device(left, device)
+            right = RelationalOperators._to_device(right, device)
+            left_keys, right_keys = RelationalOperators._join_keys(left, right, left_key, right_key)
+            return left, right, left_keys, build(right_keys)
+
+        current = torch.cuda.current_stream(device)
+        build_stream = torch.cuda.Stream(device)
+        probe_stream = torch.cuda.Stream(device)
+        build_stream.wait_stream(current)
+        probe_stream.wait_stream(current)
+
+        with torch.cuda.stream(build_stream):
+            right = RelationalOperators._to_device(right, device)
+            # Only the left dictionary and key dtype are read from the left side here
+            _, right_keys = RelationalOperators._join_keys(left, right, left_key, right_key)
+            built = build(right_keys)
+        with torch.cuda.stream(probe_stream):
+            left = RelationalOperators._to_device(left, device)
+
+        current.wait_stream(build_stream)
+        current.wait_stream(probe_stream)
+        # Tensors allocated on the side streams are used on the current stream from here on
+        for tensor in (*left.columns.values(), *right.columns.values(), *built):
+            tensor.record_stream(current)
+        return left, right, left.get_column(left_key), built
 
-        # Materialize
+    @staticmethod
+    def _to_device(table: TensorTable, device: torch.device) -> TensorTable:
+        """Table with every column on device
+
+        Only host-to-device copies are non-blocking; a non-blocking copy into
+        pageable host memory could be read before it completes.
+        """
+        if table.device == device:
+            return table
+        non_blocking = table.device.type == 'cpu' and device.type == 'cuda'
+        columns = {col: t.to(device, non_blocking=non_blocking) for col, t in table.columns.items()}
+        return TensorTable._from_validated(columns, table.schema, table.num_rows, table.dict_cols, table.sorted_by)
+
+    @staticmethod
+    def _materialize(left: TensorTable, right: TensorTable,
+                     left_idx: torch.Tensor, right_idx: torch.Tensor,
+                     sorted_by: Optional[str] = None) -> TensorTable:
+        """Gather join output rows of both sides into a left_/right_ prefixed table"""
         result_columns = {}
         result_schema = {}
+        for prefix, table, idx in (("left_", left, left_idx), ("right_", right, right_idx)):
+            for col_name, col_tensor in RelationalOperators._gather_columns(table.columns, idx).items():
+                result_columns[f"{prefix}{col_name}"] = col_tensor
+                result_schema[f"{prefix}{col_name}"] = table.schema[col_name]
+        return TensorTable._from_validated(result_columns, result_schema, left_idx.numel(),
+                                           RelationalOperators._join_dicts(left, right), sorted_by)
 
-        output_left_idx = torch.tensor(output_left_idx, device=left_keys.device)
-        output_right_idx = torch.tensor(output_right_idx, device=right_keys.device)
+    @staticmethod
+    def _gather_columns(columns: Dict[str, torch.Tensor], idx: torch.Tensor) -> Dict[str, torch.Tensor]:
+        """Gather rows idx of every column with one index_select each
 
-        for col_name, col_tensor in left.columns.items():
-            result_columns[f"left_{col_name}"] = col_tensor[output_left_idx]
-            result_schema[f"left_{col_name}"] = left.schema[col_name]
+        Only the selected rows are read; stacking same-dtype columns first
+        would copy every input row of every column to save kernel launches.
+        """
+        return {col_name: col_tensor.index_select(0, idx) for col_name, col_tensor in columns.items()}
+
+    @staticmethod
+    def _probe_sorted(left_keys: torch.Tensor, right_sorted: torch.Tensor,
+                      right_perm: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Equi-join index pairs of left_keys against sorted right keys
 
-        for col_name, col_tensor in right.columns.items():
-            result_columns[f"right_{col_name}"] = col_tensor[output_right_idx]
-            result_schema[f"right_{col_name}"] = right.schema[col_name]
+        Returns (left positions, right_perm[sorted positions]) ordered by left
+        position, then by sorted right position.
+        """
+        dtype = torch.promote_types(left_keys.dtype, right_sorted.dtype)
+        left_keys = left_keys.to(dtype)
+        right_sorted = right_sorted.to(dtype)
+
+        # Match range of each left key in the sorted right keys
+        lo = torch.searchsorted(right_sorted, left_keys, right=False)
+        hi = torch.searchsorted(right_sorted, left_keys, right=True)
+        counts = hi - lo
+
+        left_idx = torch.repeat_interleave(torch.arange(len(left_keys), device=left_keys.device), counts)
+        # Position of each output pair within its left key's range
+        range_starts = torch.cumsum(counts, 0) - counts
+        offsets = torch.arange(len(left_idx), device=left_keys.device) - torch.repeat_interleave(range_starts, counts)
+        right_positions = torch.repeat_interleave(lo, counts) + offsets
+        return left_idx, right_perm[right_positions]
 
-        return TensorTable(result_columns, result_schema)
+    @staticmethod
+    def _probe_broadcast(left_keys: torch.Tensor, right_keys: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Equi-join index pairs by broadcast equality, JOIN_BLOCK_ROWS left rows at a time
+
+        Bounds the boolean match matrix to JOIN_BLOCK_ROWS x len(right). Only
+        joins within BROADCAST_JOIN_MAX_CELLS pairs take this path, so the whole
+        matrix is at most that many bytes and fits in cache without further tiling.
+        """
+        left_parts = []
+        right_parts = []
+        for start in range(0, len(left_keys), RelationalOperators.JOIN_BLOCK_ROWS):
+            block = left_keys[start:start + RelationalOperators.JOIN_BLOCK_ROWS]
+            block_left_idx, block_right_idx = block.view(-1, 1).eq(right_keys.view(1, -1)).nonzero(as_tuple=True)
+            left_parts.append(block_left_idx + start)
+            right_parts.append(block_right_idx)
+
+        if not left_parts:
+            empty = torch.empty(0, dtype=torch.long, device=left_keys.device)
+            return empty, empty
+        return torch.cat(left_parts), torch.cat(right_parts)
 
     @staticmethod
     def group_by(table: TensorTable, group_cols: List[str],
                  agg_col: str, agg_func: str) -> TensorTable:
         """Group-by aggregation
 
-        Strategy: Concatenate group columns, sort, use uniqueConsecutive,
-        then evaluate aggregate expressions
+        Strategy: Bit-pack group columns into one key, sort, use uniqueConsecutive,
+        then evaluate aggregate expressions with segment_reduce over the sorted runs
         """
-        # Concatenate group columns horizontally
-        if len(group_cols) == 1:
-            group_tensor = table.get_column(group_cols[0])
-        else:
-            group_tensors = [table.get_column(col) for col in group_cols]
-            # Combine into single group identifier
+        group_tensors = [table.get_column(col) for col in group_cols]
+        if len(group_tensors) == 1:
             group_tensor = group_tensors[0]
-            for gt in group_tensors[1:]:
-                group_tensor = group_tensor * 10000 + gt
-
-        # Sort by group (can use radix sort for better performance)
-        sorted_indices = torch.argsort(group_tensor)
-        sorted_groups = group_tensor[sorted_indices]
-
-        # Permute all data columns to match sorted order
-        sorted_agg_col = table.get_column(agg_col)[sorted_indices]
-
-        # Find unique groups and compute inverted indexes using uniqueConsecutive
-        unique_groups, inverse_idx = torch.unique_consecutive(sorted_groups, return_inverse=True)
-
-        # Evaluate aggregate expression
-        if agg_func == 'sum':
-            agg_result = torch.zeros(len(unique_groups), device=sorted_agg_col.device)
-            agg_result.scatter_add_(0, inverse_idx, sorted_agg_col)
-        elif agg_func == 'count':
-            agg_result = torch.bincount(inverse_idx).float()
-        elif agg_func == 'avg':
-            sum_result = torch.zeros(len(unique_groups), device=sorted_agg_col.device)
-            sum_result.scatter_add_(0, inverse_idx, sorted_agg_col)
-            count_result = torch.bincount(inverse_idx).float()
-            agg_result = sum_result / count_result
-        elif agg_func == 'min':
-            agg_result = torch.full((len(unique_groups),), float('inf'), device=sorted_agg_col.device)
-            agg_result.scatter_reduce_(0, inverse_idx, sorted_agg_col, reduce='amin')
-        elif agg_func == 'max':
-            agg_result = torch.full((len(unique_groups),), float('-inf'), device=sorted_agg_col.device)
-            agg_result.scatter_reduce_(0, inverse_idx, sorted_agg_col, reduce='amax')
         else:
-            raise ValueError(f"Unsupported aggregation function: {agg_func}")
+            # Combine into single int64 group identifier
+            group_tensor = RelationalOperators._pack_group_keys(group_tensors)
+
+        # Sort by group: sorted keys and permutation in one pass (radix sort for integer keys on CUDA)
+        sorted_groups, sorted_indices = torch.sort(group_tensor, stable=True)
+
+        # Permute the aggregated column to match sorted order; count only needs the run lengths
+        if agg_func == 'count':
+            sorted_agg_col = table.get_column(agg_col)
+        else:
+            sorted_agg_col = table.get_column(agg_col)[sorted_indices]
+
+        # Find unique groups and their run lengths using uniqueConsecutive
+        unique_groups, group_counts = torch.unique_consecutive(sorted_groups, return_counts=True)
+
+        # Evaluate aggregate expression: one segmented reduction over the sorted runs
+        agg_result = RelationalOperators._aggregate(agg_func, sorted_agg_col, group_counts)
 
         # Build result table
-        result_columns = {group_cols[0]: unique_groups, f'{agg_func}_{agg_col}': agg_result}
-        result_schema = {group_cols[0]: table.schema[group_cols[0]], f'{agg_func}_{agg_col}': 'numeric'}
+        if len(group_tensors) == 1:
+            result_columns = {group_cols[0]: unique_groups}
+        else:
+            # Packed keys are not column values: take each group column from the group's first row
+            first_rows = sorted_indices[torch.cumsum(group_counts, 0) - group_counts]
+            result_columns = {col: t[first_rows] for col, t in zip(group_cols, group_tensors)}
+        result_schema = {col: table.schema[col] for col in result_columns}
+        result_columns[f'{agg_func}_{agg_col}'] = agg_result
+        result_schema[f'{agg_func}_{agg_col}'] = 'numeric'
+
+        # Groups come out in ascending key order; the first group column has the highest key bits
+        return TensorTable._from_validated(result_columns, result_schema, len(unique_groups),
+                                           RelationalOperators._select_dicts(table, group_cols), group_cols[0])
+
+    @staticmethod
+    def _aggregate(agg_func: str, sorted_agg_col: torch.Tensor, group_counts: torch.Tensor) -> torch.Tensor:
+        """Run the compiled aggregate for agg_func, falling back to eager if compilation fails
+
+        Aggregates are compiled with dynamic=True, so a new number of groups
+        or rows does not trigger recompilation.
+        """
+        eager = RelationalOperators.AGG_FUNCS.get(agg_func)
+        if eager is None:
+            raise ValueError(f"Unsupported aggregation function: {agg_func}")
+
+        fn = RelationalOperators._agg_cache.get(agg_func)
+        if fn is eager:
+            return eager(sorted_agg_col, group_counts)
+
+        try:
+            if fn is None:
+                fn = torch.compile(eager, dynamic=True) if hasattr(torch, 'compile') else eager
+                RelationalOperators._agg_cache[agg_func] = fn
+            return fn(sorted_agg_col, group_counts)
+        except RuntimeError:
+            # torch.compile unsupported here (e.g. Dynamo on this Python version)
+            # or no working compiler backend (e.g. Inductor without a C++ toolchain)
+            RelationalOperators._agg_cache[agg_func] = eager
+            return eager(sorted_agg_col, group_counts)
 
-        return TensorTable(result_columns, result_schema)
+    @staticmethod
+    def _pack_group_keys(group_tensors: List[torch.Tensor]) -> torch.Tensor:
+        """Pack group columns into one int64 key: (k0 << w1 | k1) << w2 | k2 ...
+
+        Each column is replaced by its dense rank (index among its sorted unique
+        values) and given (n_unique - 1).bit_length() bits, so distinct column
+        tuples always get distinct keys, and keys order like the tuples. At most
+        63 bits are used, keeping keys non-negative.
+        """
+        if group_tensors[0].numel() == 0:
+            return group_tensors[0].to(torch.int64)
+
+        keys = []
+        widths = []
+        for t in group_tensors:
+            uniques, rank = torch.unique(t, return_inverse=True)
+            keys.append(rank)
+            widths.append((len(uniques) - 1).bit_length())
+        if sum(widths) > 63:
+            raise ValueError(f"Group keys need {sum(widths)} bits; at most 63 can be packed")
+
+        packed = keys[0]
+        for key, width in zip(keys[1:], widths[1:]):
+            packed = (packed << width) | key
+        return packed
@@ -3,9 +3,23 @@ from pyspark.sql import SparkSession
 
 
 class PhysicalQueryPlan:
+    """Generates Spark query plans; keeps one Spark session until close()
+
+    Usable as a context manager, which closes the session on exit.
+    """
     def __init__(self) -> None:
         self.sc = self.__initialize_spark()
 
+    def close(self):
+        """Stop the Spark session"""
+        self.sc.stop()
+
+    def __enter__(self) -> 'PhysicalQueryPlan':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def __initialize_spark(self):
         """Initialize Spark session with proper error handling."""
         try:
@@ -39,40 +53,36 @@ class PhysicalQueryPlan:
         Returns:
         --------
         str: The query plan
+
+        The session stays open for further queries; call close() when done.
         """    
         try:
             # Create a DataFrame from the SQL query
             df = self.sc.sql(sql_query)
+            query_execution = df._jdf.queryExecution()
             
             # Get the query plan based on type
             if plan_type == "simple":
-                plan = df._jdf.queryExecution().simpleString()
+                plan = query_execution.simpleString()
             elif plan_type == "extended":
-                plan = df._jdf.queryExecution().toString()
+                plan = query_execution.toString()
             elif plan_type == "cost":
-                plan = df._jdf.queryExecution().stringWithStats()
+                plan = query_execution.stringWithStats()
             elif plan_type == "formatted":
-                plan = df._jdf.queryExecution().explainString(
-                    self.sc._jvm.org.apache.spark.sql.execution.ExplainMode.fromString("formatted")
-                )
+                plan = self._explain(df, "formatted")
             else:
                 # Default to explain output
-                plan = df._jdf.queryExecution().toString()
+                plan = query_execution.toString()
             
             return plan
         
         except Exception as e:
             return f"Error generating query plan: {str(e)}"
-        
-        finally:
-            # Stop the Spark session
-            self.sc.stop()
-            pass
 
 
     def explain_query(self, sql_query, mode="extended"):
         """
-        Alternative method using DataFrame.explain() which is more user-friendly.
+        Alternative method returning the DataFrame.explain() output, which is more user-friendly.
         
         Parameters:
         -----------
@@ -83,24 +93,16 @@ class PhysicalQueryPlan:
         """    
         try:
             df = self.sc.sql(sql_query)
-            
-            # Capture explain output
-            import sys
-            from io import StringIO
-            
-            old_stdout = sys.stdout
-            sys.stdout = captured_output = StringIO()
-            
-            df.explain(mode=mode)
-            
-            sys.stdout = old_stdout
-            plan = captured_output.getvalue()
-            
-            return plan
+            return self._explain(df, mode)
         
         except Exception as e:
             return f"Error generating query plan: {str(e)}"
 
+    def _explain(self, df, mode):
+        """Explain output of a DataFrame, taken from the JVM without capturing stdout"""
+        explain_mode = self.sc._jvm.org.apache.spark.sql.execution.ExplainMode.fromString(mode)
+        return df._jdf.queryExecution().explainString(explain_mode)
+
 
 # Example usage
 # if __name__ == "__main__":
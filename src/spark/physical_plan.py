@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import Hashable, List, Dict
+
+from ir import freeze
 
 
 class SparkPhysicalPlan(ABC):
@@ -8,6 +10,10 @@ class SparkPhysicalPlan(ABC):
     def to_dict(self) -> Dict:
         pass
 
+    def fingerprint(self) -> Hashable:
+        """Stable hashable key identifying the plan tree by structure and values"""
+        return freeze(self.to_dict())
+
 
 class Project(SparkPhysicalPlan):
     def __init__(self, columns: List[str], child: SparkPhysicalPlan):
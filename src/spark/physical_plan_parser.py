@@ -1,7 +1,117 @@
 from physical_plan import SparkPhysicalPlan
 
 from ir import IRNode, OpType, Expression, ExprType
-from typing import Dict
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def _mk_scan(node: SparkPhysicalPlan, children: List[IRNode]) -> IRNode:
+    return IRNode(
+        op_type=OpType.SCAN,
+        children=[],
+        params={'table': node.table_name, 'schema': node.schema}
+    )
+
+
+def _mk_filter(node: SparkPhysicalPlan, children: List[IRNode]) -> IRNode:
+    return IRNode(
+        op_type=OpType.FILTER,
+        children=children,
+        params={'condition': _parse_condition(node.condition)}
+    )
+
+
+def _mk_project(node: SparkPhysicalPlan, children: List[IRNode]) -> IRNode:
+    return IRNode(
+        op_type=OpType.PROJECT,
+        children=children,
+        params={'columns': node.columns}
+    )
+
+
+def _mk_sort(node: SparkPhysicalPlan, children: List[IRNode]) -> IRNode:
+    return IRNode(
+        op_type=OpType.SORT,
+        children=children,
+        params={'key': node.key, 'ascending': node.ascending}
+    )
+
+
+def _mk_join(op_type: OpType) -> Callable[[SparkPhysicalPlan, List[IRNode]], IRNode]:
+    def mk_join(node: SparkPhysicalPlan, children: List[IRNode]) -> IRNode:
+        return IRNode(
+            op_type=op_type,
+            children=children,
+            params={
+                'left_key': node.left_key,
+                'right_key': node.right_key,
+                'join_type': node.join_type
+            }
+        )
+    return mk_join
+
+
+def _mk_group_by(node: SparkPhysicalPlan, children: List[IRNode]) -> IRNode:
+    return IRNode(
+        op_type=OpType.GROUP_BY,
+        children=children,
+        params={
+            'group_cols': node.group_cols,
+            'agg_exprs': node.agg_exprs
+        }
+    )
+
+
+# Spark operator name -> (child attributes, IR builder taking the node and its parsed children)
+_HANDLERS: Dict[str, Tuple[Tuple[str, ...], Callable[[SparkPhysicalPlan, List[IRNode]], IRNode]]] = {
+    'FileScan': ((), _mk_scan),
+    'Filter': (('child',), _mk_filter),
+    'Project': (('child',), _mk_project),
+    'Sort': (('child',), _mk_sort),
+    'SortMergeJoin': (('left', 'right'), _mk_join(OpType.SORT_JOIN)),
+    'BroadcastHashJoin': (('left', 'right'), _mk_join(OpType.HASH_JOIN)),
+    'HashAggregate': (('child',), _mk_group_by),
+}
+
+
+def _mk_binary(expr_type: ExprType) -> Callable[[Dict, List[Expression]], Expression]:
+    return lambda cond, children: Expression(expr_type=expr_type, children=children)
+
+
+# Condition operator -> (number of operands, Expression builder taking the condition and its parsed operands)
+_COND_HANDLERS: Dict[str, Tuple[int, Callable[[Dict, List[Expression]], Expression]]] = {
+    'column': (0, lambda cond, children: Expression(expr_type=ExprType.COLUMN, value=cond['name'])),
+    'literal': (0, lambda cond, children: Expression(expr_type=ExprType.LITERAL, value=cond['value'])),
+    '<': (2, _mk_binary(ExprType.LT)),
+    '>': (2, _mk_binary(ExprType.GT)),
+    '=': (2, _mk_binary(ExprType.EQ)),
+}
+
+
+def _parse_condition(cond: Dict) -> Expression:
+    """Parse filter condition to Expression tree (iterative post-order walk)"""
+    results: List[Expression] = []
+    stack: List[Tuple[Dict, bool]] = [(cond, False)]
+
+    while stack:
+        node, expanded = stack.pop()
+        op = node['op']
+        handler = _COND_HANDLERS.get(op)
+        if handler is None:
+            raise ValueError(f"Unsupported condition operator: {op}")
+        arity, build = handler
+
+        if arity and not expanded:
+            # Post-order: operands first, left before right
+            stack.append((node, True))
+            stack.append((node['right'], False))
+            stack.append((node['left'], False))
+            continue
+
+        operands = results[len(results) - arity:]
+        del results[len(results) - arity:]
+        results.append(build(node, operands))
+
+    return results.pop()
 
 
 class SparkPhysicalPlanParser:
@@ -11,108 +121,37 @@ class SparkPhysicalPlanParser:
     """
 
     def parse(self, spark_plan: SparkPhysicalPlan) -> IRNode:
-        """Convert Spark physical plan to TQP IR using DFS post-order traversal"""
-        plan_dict = spark_plan.to_dict()
-        return self._parse_node(plan_dict)
-
-    def _parse_node(self, node: Dict) -> IRNode:
-        """Recursively parse Spark plan node"""
-        node_type = node['type']
-
-        if node_type == 'FileScan':
-            return IRNode(
-                op_type=OpType.SCAN,
-                children=[],
-                params={'table': node['table'], 'schema': node['schema']}
-            )
-
-        elif node_type == 'Filter':
-            child_ir = self._parse_node(node['child'])
-            condition = self._parse_condition(node['condition'])
-            return IRNode(
-                op_type=OpType.FILTER,
-                children=[child_ir],
-                params={'condition': condition}
-            )
-
-        elif node_type == 'Project':
-            child_ir = self._parse_node(node['child'])
-            return IRNode(
-                op_type=OpType.PROJECT,
-                children=[child_ir],
-                params={'columns': node['columns']}
-            )
-
-        elif node_type == 'Sort':
-            child_ir = self._parse_node(node['child'])
-            return IRNode(
-                op_type=OpType.SORT,
-                children=[child_ir],
-                params={'key': node['key'], 'ascending': node['ascending']}
-            )
-
-        elif node_type == 'SortMergeJoin':
-            left_ir = self._parse_node(node['left'])
-            right_ir = self._parse_node(node['right'])
-            return IRNode(
-                op_type=OpType.SORT_JOIN,
-                children=[left_ir, right_ir],
-                params={
-                    'left_key': node['left_key'],
-                    'right_key': node['right_key'],
-                    'join_type': node['join_type']
-                }
-            )
-
-        elif node_type == 'BroadcastHashJoin':
-            left_ir = self._parse_node(node['left'])
-            right_ir = self._parse_node(node['right'])
-            return IRNode(
-                op_type=OpType.HASH_JOIN,
-                children=[left_ir, right_ir],
-                params={
-                    'left_key': node['left_key'],
-                    'right_key': node['right_key'],
-                    'join_type': node['join_type']
-                }
-            )
-
-        elif node_type == 'HashAggregate':
-            child_ir = self._parse_node(node['child'])
-            return IRNode(
-                op_type=OpType.GROUP_BY,
-                children=[child_ir],
-                params={
-                    'group_cols': node['group_cols'],
-                    'agg_exprs': node['agg_exprs']
-                }
-            )
-
-        else:
-            raise ValueError(f"Unsupported Spark operator: {node_type}")
+        """Convert Spark physical plan to TQP IR using DFS post-order traversal
+
+        The plan objects are walked directly with an explicit stack (no
+        intermediate to_dict() tree); operators dispatch through _HANDLERS.
+        """
+        # id(plan node) -> parsed IR node
+        memo: Dict[int, IRNode] = {}
+        stack: List[Tuple[Any, bool]] = [(spark_plan, False)]
+
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in memo:
+                continue
+            node_type = type(node).__name__
+            handler = _HANDLERS.get(node_type)
+            if handler is None:
+                raise ValueError(f"Unsupported Spark operator: {node_type}")
+            child_attrs, build = handler
+
+            if not expanded:
+                # Process children first, left before right
+                stack.append((node, True))
+                for attr in reversed(child_attrs):
+                    stack.append((getattr(node, attr), False))
+                continue
+
+            children = [memo[id(getattr(node, attr))] for attr in child_attrs]
+            memo[id(node)] = build(node, children)
+
+        return memo[id(spark_plan)]
 
     def _parse_condition(self, cond: Dict) -> Expression:
         """Parse filter condition to Expression tree"""
-        op = cond['op']
-
-        if op == 'column':
-            return Expression(expr_type=ExprType.COLUMN, value=cond['name'])
-        elif op == 'literal':
-            return Expression(expr_type=ExprType.LITERAL, value=cond['value'])
-        elif op == '<':
-            return Expression(expr_type=ExprType.LT, children=[
-                self._parse_condition(cond['left']),
-                self._parse_condition(cond['right'])
-            ])
-        elif op == '>':
-            return Expression(expr_type=ExprType.GT, children=[
-                self._parse_condition(cond['left']),
-                self._parse_condition(cond['right'])
-            ])
-        elif op == '=':
-            return Expression(expr_type=ExprType.EQ, children=[
-                self._parse_condition(cond['left']),
-                self._parse_condition(cond['right'])
-            ])
-        else:
-            raise ValueError(f"Unsupported condition operator: {op}")
+        return _parse_condition(cond)
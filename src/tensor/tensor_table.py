@@ -1,17 +1,76 @@
-from typing import Dict, List
+from array import array
+from functools import cached_property
+from typing import Any, Dict, Hashable, List, Optional
 import torch
 
 
+class _DictKey:
+    """Dictionary content with its hash computed once (tuples rehash on every lookup)"""
+    __slots__ = ('content', 'hash')
+
+    def __init__(self, content: Hashable):
+        self.content = content
+        self.hash = hash(content)
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        if not isinstance(other, _DictKey):
+            return NotImplemented
+        return self.content is other.content or (self.hash == other.hash and self.content == other.content)
+
+
 class TensorTable:
-    """Columnar tensor representation of a relational table"""
-    def __init__(self, columns: Dict[str, torch.Tensor], schema: Dict[str, str]):
+    """Columnar tensor representation of a relational table
+
+    Schema types:
+    - 'numeric': 1D float32 tensor
+    - 'string': n×max_len tensor of code points (uint8, or int32 beyond latin-1)
+    - 'dict_string': 1D int32 codes into the sorted dictionary dict_cols[col]
+
+    sorted_by names a column the rows are known to be in ascending order of.
+    """
+    def __init__(self, columns: Dict[str, torch.Tensor], schema: Dict[str, str],
+                 dict_cols: Optional[Dict[str, List[str]]] = None, sorted_by: Optional[str] = None):
         self.columns = columns
         self.schema = schema
+        self.dict_cols = dict_cols if dict_cols is not None else {}
+        self.sorted_by = sorted_by
         self.num_rows = len(next(iter(columns.values()))) if columns else 0
 
+    @classmethod
+    def _from_validated(cls, columns: Dict[str, torch.Tensor], schema: Dict[str, str], num_rows: int,
+                        dict_cols: Optional[Dict[str, List[str]]] = None,
+                        sorted_by: Optional[str] = None) -> 'TensorTable':
+        """Construct from operator output whose row count is already known
+
+        Skips the row-count probe of __init__; the caller guarantees every
+        column has num_rows rows.
+        """
+        table = cls.__new__(cls)
+        table.columns = columns
+        table.schema = schema
+        table.dict_cols = dict_cols if dict_cols is not None else {}
+        table.sorted_by = sorted_by
+        table.num_rows = num_rows
+        return table
+
     def __len__(self):
         return self.num_rows
 
+    @cached_property
+    def device(self) -> torch.device:
+        """Device holding the table's columns (all columns share one device)"""
+        for tensor in self.columns.values():
+            return tensor.device
+        return torch.device('cpu')
+
+    @cached_property
+    def dict_key(self) -> '_DictKey':
+        """Hashable content of the string dictionaries, built and hashed once per table"""
+        return _DictKey(tuple((col, tuple(uniques)) for col, uniques in self.dict_cols.items()))
+
     def get_column(self, name: str) -> torch.Tensor:
         return self.columns[name]
     
@@ -19,26 +78,75 @@ class TensorTable:
         return list(self.columns.values())
 
     @staticmethod
-    def from_dict(data: Dict[str, List], device='cpu') -> 'TensorTable':
-        """Convert dictionary of lists to TensorTable"""
+    def from_dict(data: Dict[str, List], device='cpu', dict_encode: bool = True,
+                  pin_memory: bool = False) -> 'TensorTable':
+        """Convert dictionary of lists to TensorTable
+
+        String columns are dictionary encoded ('dict_string') unless
+        dict_encode is False, in which case they are stored as code points.
+        With pin_memory, CPU columns are page-locked so later copies to a CUDA
+        device can be asynchronous (ignored on hosts without CUDA).
+        """
         columns = {}
         schema = {}
+        dict_cols = {}
         
         for col_name, col_data in data.items():
-            if isinstance(col_data[0], str):
-                # String encoding: n×m tensor
-                max_len = max(len(s) for s in col_data)
-                tensor = torch.zeros((len(col_data), max_len), dtype=torch.long, device=device)
-                for i, s in enumerate(col_data):
-                    for j, c in enumerate(s):
-                        tensor[i, j] = ord(c)
+            if isinstance(col_data[0], str) and dict_encode:
+                # Dictionary encoding: int32 codes into the sorted unique values
+                uniques = sorted(set(col_data))
+                index = {s: i for i, s in enumerate(uniques)}
+                codes = array('i', map(index.__getitem__, col_data))
+                tensor = torch.frombuffer(codes, dtype=torch.int32).to(device)
+                schema[col_name] = 'dict_string'
+                dict_cols[col_name] = uniques
+            elif isinstance(col_data[0], str):
+                # String encoding: n×m tensor of code points
+                tensor = TensorTable._encode_strings(col_data).to(device)
                 schema[col_name] = 'string'
             elif isinstance(col_data[0], (int, float)):
-                tensor = torch.tensor(col_data, dtype=torch.float32, device=device)
+                # array.array converts in C; frombuffer wraps its memory without a copy
+                tensor = torch.frombuffer(array('f', col_data), dtype=torch.float32).to(device)
                 schema[col_name] = 'numeric'
             else:
                 raise ValueError(f"Unsupported data type for column {col_name}")
-            
+
+            if pin_memory and tensor.device.type == 'cpu' and torch.cuda.is_available():
+                tensor = tensor.pin_memory()
             columns[col_name] = tensor
         
-        return TensorTable(columns, schema)
+        return TensorTable(columns, schema, dict_cols)
+
+    def to_dict(self) -> Dict[str, List[Any]]:
+        """Convert TensorTable back to a dictionary of lists (strings decoded)"""
+        data = {}
+        for col_name, tensor in self.columns.items():
+            values = tensor.tolist()
+            if self.schema[col_name] == 'dict_string':
+                uniques = self.dict_cols[col_name]
+                data[col_name] = [uniques[code] for code in values]
+            elif self.schema[col_name] == 'string':
+                data[col_name] = [''.join(map(chr, row)).rstrip('\x00') for row in values]
+            else:
+                data[col_name] = values
+        return data
+
+    @staticmethod
+    def _encode_strings(col_data: List[str]) -> torch.Tensor:
+        """n×max_len tensor of code points, zero padded, built from one bytes buffer
+
+        Strings are encoded into a single padded buffer (1 byte per char when
+        every code point fits latin-1, else 4 via UTF-32) and viewed as a tensor.
+        Lone surrogates are kept as their code points.
+        """
+        max_len = max(map(len, col_data))
+        if max_len == 0:
+            return torch.zeros((len(col_data), 0), dtype=torch.uint8)
+        try:
+            buffer = bytearray(b''.join(s.encode('latin-1').ljust(max_len, b'\x00') for s in col_data))
+            dtype = torch.uint8
+        except UnicodeEncodeError:
+            buffer = bytearray(b''.join(s.encode('utf-32-le', 'surrogatepass').ljust(4 * max_len, b'\x00')
+                                        for s in col_data))
+            dtype = torch.int32
+        return torch.frombuffer(buffer, dtype=dtype).view(len(col_data), max_len)
@@ -0,0 +1,47 @@
+from executor import TQPExecutor
+from tensor import TensorTable
+
+
+def _node(op_func, inputs, output, params=None):
+    return {"op": output, "op_func": op_func, "inputs": inputs, "output": output, "params": params or {}}
+
+
+def _run(plan):
+    tables = {'a': TensorTable.from_dict({'x': [1.0]}), 'b': TensorTable.from_dict({'y': [2.0]})}
+    return TQPExecutor(plan).execute(tables), tables
+
+
+def test_input_list_convention_is_recognized_by_position():
+    seen = []
+
+    def binary(tables, p):
+        seen.append((tables, p))
+        return tables[0]
+
+    def unary(tables, params=None):
+        seen.append((tables, params))
+        return tables[0]
+
+    result, tables = _run([_node(binary, ['a', 'b'], 'joined', {'key': 'x'}),
+                           _node(unary, ['joined'], 'final', {'limit': 1})])
+
+    assert result is tables['a']
+    assert seen == [([tables['a'], tables['b']], {'key': 'x'}), ([tables['a']], {'limit': 1})]
+
+
+def test_tables_and_named_params_are_passed_positionally_and_by_keyword():
+    seen = []
+
+    def with_param(table, limit):
+        seen.append((table, limit))
+        return table
+
+    def binary(left: TensorTable, right: TensorTable):
+        seen.append((left, right))
+        return right
+
+    result, tables = _run([_node(with_param, ['a'], 'limited', {'limit': 1, 'unused': 2}),
+                           _node(binary, ['limited', 'b'], 'final')])
+
+    assert result is tables['b']
+    assert seen == [(tables['a'], 1), (tables['a'], tables['b'])]
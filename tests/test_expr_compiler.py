@@ -0,0 +1,78 @@
+import pytest
+
+from expr import ExpressionCompiler
+from ir import Expression, ExprType
+from relational_operator import RelationalOperators
+from tensor import TensorTable
+
+
+def _column(name):
+    return Expression(expr_type=ExprType.COLUMN, value=name)
+
+
+def _literal(value):
+    return Expression(expr_type=ExprType.LITERAL, value=value)
+
+
+def _binary(expr_type, left, right):
+    return Expression(expr_type=expr_type, children=[left, right])
+
+
+def _names(table, condition):
+    return RelationalOperators.filter(table, ExpressionCompiler.compile_fused(condition)).to_dict().get('name', [])
+
+
+@pytest.fixture
+def people():
+    return TensorTable.from_dict({'name': ['Carol', 'Alice', 'Bob', 'Alice'], 'age': [30.0, 20.0, 40.0, 50.0]})
+
+
+def test_string_literal_compares_with_dict_string_codes(people):
+    assert _names(people, _binary(ExprType.EQ, _column('name'), _literal('Alice'))) == ['Alice', 'Alice']
+    assert _names(people, _binary(ExprType.EQ, _literal('Bob'), _column('name'))) == ['Bob']
+    assert _names(people, _binary(ExprType.EQ, _column('name'), _literal('Dave'))) == []
+
+
+def test_string_literal_missing_from_the_dictionary_orders_correctly(people):
+    # 'Ann' sorts between 'Alice' and 'Bob' but is not in the dictionary
+    assert _names(people, _binary(ExprType.GT, _column('name'), _literal('Ann'))) == ['Carol', 'Bob']
+    assert _names(people, _binary(ExprType.LEQ, _column('name'), _literal('Ann'))) == ['Alice', 'Alice']
+
+
+def test_string_literal_in_a_compound_predicate(people):
+    condition = _binary(ExprType.AND,
+                        _binary(ExprType.EQ, _column('name'), _literal('Alice')),
+                        _binary(ExprType.GT, _column('age'), _literal(25)))
+    assert _names(people, condition) == ['Alice']
+
+
+def test_string_literal_needs_a_dict_string_column():
+    table = TensorTable.from_dict({'name': ['Alice']}, dict_encode=False)
+    with pytest.raises(ValueError, match='dict_string'):
+        _names(table, _binary(ExprType.EQ, _column('name'), _literal('Alice')))
+
+
+@pytest.mark.parametrize('condition, rows', [
+    (_literal(True), 4),
+    (_binary(ExprType.LT, _literal(1), _literal(2)), 4),
+    (_binary(ExprType.GT, _literal(1), _literal(2)), 0),
+])
+def test_literal_only_predicates_apply_to_every_row(people, condition, rows):
+    assert len(RelationalOperators.filter(people, ExpressionCompiler.compile_fused(condition))) == rows
+
+
+def test_literal_tensors_are_reused_and_bounded(monkeypatch):
+    monkeypatch.setattr(ExpressionCompiler, '_literal_cache', type(ExpressionCompiler._literal_cache)())
+    monkeypatch.setattr(ExpressionCompiler, 'LITERAL_CACHE_SIZE', 2)
+    table = TensorTable.from_dict({'x': [1.0, 2.0]})
+    # x + 1 < 3 builds the literal 1 on every evaluation
+    condition = _binary(ExprType.LT, _binary(ExprType.ADD, _column('x'), _literal(1)), _literal(3))
+
+    ExpressionCompiler.compile(condition, table)
+    cached = dict(ExpressionCompiler._literal_cache)
+    ExpressionCompiler.compile(condition, table)
+    assert all(ExpressionCompiler._literal_cache[key] is literal for key, literal in cached.items())
+
+    for value in (5, 6, 7):
+        ExpressionCompiler._literal(value, None, table.device)
+    assert len(ExpressionCompiler._literal_cache) == 2
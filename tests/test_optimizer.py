@@ -0,0 +1,46 @@
+from ir import IRNode, OpType, Expression, ExprType, IROptimizer
+
+
+def _scan(name, *columns):
+    return IRNode(op_type=OpType.SCAN, children=[], params={'table': name, 'schema': {c: 'int' for c in columns}})
+
+
+def _lt(column, value):
+    return Expression(expr_type=ExprType.LT, children=[
+        Expression(expr_type=ExprType.COLUMN, value=column),
+        Expression(expr_type=ExprType.LITERAL, value=value),
+    ])
+
+
+def _filter(child, condition):
+    return IRNode(op_type=OpType.FILTER, children=[child], params={'condition': condition})
+
+
+def _join(left, right):
+    return IRNode(op_type=OpType.HASH_JOIN, children=[left, right], params={'join_type': 'inner'})
+
+
+def _filters(node):
+    """(condition, child) of every filter in the tree"""
+    found = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.op_type == OpType.FILTER:
+            found.append((node.params['condition'], node.children[0]))
+        stack.extend(node.children)
+    return found
+
+
+def test_push_down_through_nested_joins_keeps_every_predicate():
+    # Pushed side filters are new nodes; they must never hit a memo entry
+    # left behind by a replaced node whose id they reuse
+    for _ in range(200):
+        a, b, c = _scan('a', 'x'), _scan('b', 'y'), _scan('c', 'z')
+        ir = _filter(_join(_filter(_join(a, b), _lt('left_x', 5)), c), _lt('left_right_y', 7))
+
+        filters = _filters(IROptimizer().optimize(ir))
+
+        assert {child.params['table']: cond for cond, child in filters} == \
+            {'a': _lt('x', 5), 'b': _lt('y', 7)}
+        assert len(filters) == 2
@@ -0,0 +1,110 @@
+from executor import TQPExecutor
+from ir import IRNode, OpType, Expression, ExprType
+from planner import TQPPlanner
+from tensor import TensorTable
+
+
+def _scan(name, table):
+    return IRNode(op_type=OpType.SCAN, children=[], params={'table': name, 'schema': dict(table.schema)})
+
+
+def _filter_lt(child, column, value):
+    condition = Expression(expr_type=ExprType.LT, children=[
+        Expression(expr_type=ExprType.COLUMN, value=column),
+        Expression(expr_type=ExprType.LITERAL, value=value),
+    ])
+    return IRNode(op_type=OpType.FILTER, children=[child], params={'condition': condition})
+
+
+def _hash_join(left, right, key):
+    return IRNode(op_type=OpType.HASH_JOIN, children=[left, right],
+                  params={'left_key': key, 'right_key': key, 'join_type': 'inner'})
+
+
+def _eager(ir, tables):
+    return TQPExecutor(TQPPlanner().plan(ir)).execute(tables).to_dict()
+
+
+def _count_variants(monkeypatch):
+    """Number of _pipeline_variant calls, as a one-element list updated in place"""
+    calls = [0]
+    build = TQPPlanner._pipeline_variant
+
+    def counting(*args):
+        calls[0] += 1
+        return build(*args)
+
+    monkeypatch.setattr(TQPPlanner, '_pipeline_variant', staticmethod(counting))
+    return calls
+
+
+def test_compiled_calls_match_the_eager_first_call():
+    tables = {'t': TensorTable.from_dict({'x': [1.0, 7.0, 3.0, 9.0], 'name': ['a', 'b', 'c', 'd']})}
+    ir = _filter_lt(_scan('t', tables['t']), 'x', 5)
+    pipeline = TQPPlanner().compile_pipeline(ir, tables)
+
+    expected = {'x': [1.0, 3.0], 'name': ['a', 'c']}
+    assert _eager(ir, tables) == expected
+    # First call runs eagerly and records the layout; later calls are compiled
+    for _ in range(3):
+        assert pipeline(tables).to_dict() == expected
+
+
+def test_join_without_matches_first_then_with_matches():
+    left = TensorTable.from_dict({'k': [1.0, 2.0, 2.0], 'a': [10.0, 20.0, 21.0]})
+    miss = TensorTable.from_dict({'k': [3.0, 4.0], 'b': [30.0, 40.0]})
+    hit = TensorTable.from_dict({'k': [2.0, 5.0], 'b': [50.0, 60.0]})
+    ir = _hash_join(_scan('l', left), _scan('r', miss), 'k')
+    pipeline = TQPPlanner().compile_pipeline(ir, {'l': left, 'r': miss})
+
+    assert pipeline({'l': left, 'r': miss}).to_dict() == {}
+    expected = _eager(ir, {'l': left, 'r': hit})
+    assert expected == {'left_k': [2.0, 2.0], 'left_a': [20.0, 21.0], 'right_k': [2.0, 2.0], 'right_b': [50.0, 50.0]}
+    for _ in range(3):
+        assert pipeline({'l': left, 'r': hit}).to_dict() == expected
+    assert pipeline({'l': left, 'r': miss}).to_dict() == {}
+
+
+def test_dictionary_variants_switch_and_evict(monkeypatch):
+    monkeypatch.setattr(TQPPlanner, 'PIPELINE_VARIANTS', 1)
+    calls = _count_variants(monkeypatch)
+    first = TensorTable.from_dict({'x': [1.0, 7.0, 3.0], 'name': ['a', 'b', 'c']})
+    second = TensorTable.from_dict({'x': [2.0, 4.0, 8.0], 'name': ['x', 'y', 'z']})
+    # Same content as `first` in new objects: same variant
+    first_copy = TensorTable.from_dict({'x': [1.0, 7.0, 3.0], 'name': ['a', 'b', 'c']})
+    ir = _filter_lt(_scan('t', first), 'x', 5)
+    pipeline = TQPPlanner().compile_pipeline(ir, {'t': first})
+
+    assert pipeline({'t': first}).to_dict() == {'x': [1.0, 3.0], 'name': ['a', 'c']}
+    assert pipeline({'t': first_copy}).to_dict() == {'x': [1.0, 3.0], 'name': ['a', 'c']}
+    assert calls[0] == 1
+    assert pipeline({'t': second}).to_dict() == {'x': [2.0, 4.0], 'name': ['x', 'y']}
+    assert calls[0] == 2
+    # Only one variant is kept: the first dictionaries get a new one
+    assert pipeline({'t': first}).to_dict() == {'x': [1.0, 3.0], 'name': ['a', 'c']}
+    assert calls[0] == 3
+
+
+def test_dictionary_variants_are_reused_within_the_bound(monkeypatch):
+    calls = _count_variants(monkeypatch)
+    first = TensorTable.from_dict({'x': [1.0], 'name': ['a']})
+    second = TensorTable.from_dict({'x': [2.0], 'name': ['b']})
+    ir = _filter_lt(_scan('t', first), 'x', 5)
+    pipeline = TQPPlanner().compile_pipeline(ir, {'t': first})
+
+    for table in (first, second, first, second):
+        pipeline({'t': table})
+    assert calls[0] == 2
+
+
+def test_pipeline_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(TQPPlanner, 'PIPELINE_CACHE_SIZE', 1)
+    tables = {'t': TensorTable.from_dict({'x': [1.0, 7.0]})}
+    planner = TQPPlanner()
+    ir_a = _filter_lt(_scan('t', tables['t']), 'x', 5)
+    ir_b = _filter_lt(_scan('t', tables['t']), 'x', 8)
+
+    pipeline_a = planner.compile_pipeline(ir_a, tables)
+    assert planner.compile_pipeline(ir_a, tables) is pipeline_a
+    planner.compile_pipeline(ir_b, tables)
+    assert planner.compile_pipeline(ir_a, tables) is not pipeline_a
@@ -0,0 +1,142 @@
+import pytest
+import torch
+
+from relational_operator import RelationalOperators
+from tensor import TensorTable
+
+
+CUTOFF = RelationalOperators.BROADCAST_JOIN_MAX_CELLS
+JOINS = [RelationalOperators.hash_join, RelationalOperators.sort_merge_join]
+
+
+def _numeric(**columns):
+    return TensorTable({name: torch.tensor(values, dtype=torch.float32) for name, values in columns.items()},
+                       {name: 'numeric' for name in columns})
+
+
+def _pairs(result):
+    """(left row id, right row id) of every output row, in output order"""
+    if len(result) == 0:
+        return []
+    return list(zip(result.get_column('left_id').tolist(), result.get_column('right_id').tolist()))
+
+
+def _nested_loop_pairs(left_keys, right_keys):
+    return [(i, j) for i, lk in enumerate(left_keys) for j, rk in enumerate(right_keys) if lk == rk]
+
+
+@pytest.mark.parametrize('join', JOINS)
+def test_join_duplicate_keys_on_both_sides(join):
+    left = _numeric(k=[1, 2, 1, 3], id=[0, 1, 2, 3])
+    right = _numeric(k=[1, 4, 1, 2, 2], id=[0, 1, 2, 3, 4])
+
+    result = join(left, right, 'k', 'k')
+
+    assert sorted(_pairs(result)) == [(0, 0), (0, 2), (1, 3), (1, 4), (2, 0), (2, 2)]
+    assert result.get_column('left_k').tolist() == result.get_column('right_k').tolist()
+
+
+@pytest.mark.parametrize('join', JOINS)
+@pytest.mark.parametrize('empty_side', ['left', 'right'])
+def test_join_with_an_empty_side(join, empty_side):
+    full = _numeric(k=[1, 2, 3], id=[0, 1, 2])
+    empty = _numeric(k=[], id=[])
+    left, right = (empty, full) if empty_side == 'left' else (full, empty)
+
+    result = join(left, right, 'k', 'k')
+
+    assert len(result) == 0
+
+
+@pytest.mark.parametrize('right_rows', [CUTOFF // 256, CUTOFF // 256 + 1])
+def test_hash_join_probes_agree_around_the_broadcast_cutoff(right_rows):
+    # 256 x 256 pairs take the broadcast probe, 256 x 257 the searchsorted probe
+    generator = torch.Generator().manual_seed(0)
+    left_keys = torch.randint(0, 40, (256,), generator=generator).float()
+    right_keys = torch.randint(0, 40, (right_rows,), generator=generator).float()
+    left = _numeric(k=left_keys.tolist(), id=list(range(256)))
+    right = _numeric(k=right_keys.tolist(), id=list(range(right_rows)))
+
+    expected = _nested_loop_pairs(left_keys.tolist(), right_keys.tolist())
+    assert _pairs(RelationalOperators.hash_join(left, right, 'k', 'k')) == expected
+
+    broadcast = RelationalOperators._probe_broadcast(left_keys, right_keys)
+    probed = RelationalOperators._probe_sorted(left_keys, *torch.sort(right_keys, stable=True))
+    assert broadcast[0].tolist() == probed[0].tolist()
+    assert broadcast[1].tolist() == probed[1].tolist()
+
+
+@pytest.mark.parametrize('join', JOINS)
+def test_join_dict_string_keys_with_different_dictionaries(join):
+    left = TensorTable.from_dict({'name': ['b', 'a', 'c', 'b'], 'id': [0.0, 1.0, 2.0, 3.0]})
+    right = TensorTable.from_dict({'name': ['d', 'c', 'b'], 'id': [0.0, 1.0, 2.0]})
+    assert left.dict_cols['name'] != right.dict_cols['name']
+
+    result = join(left, right, 'name', 'name')
+
+    assert sorted(_pairs(result)) == [(0.0, 2.0), (2.0, 1.0), (3.0, 2.0)]
+    data = result.to_dict()
+    assert data['left_name'] == data['right_name']
+
+
+@pytest.mark.parametrize('join', JOINS)
+def test_join_dict_string_keys_with_disjoint_dictionaries(join):
+    # Right strings missing from the left dictionary recode to -1 and match nothing
+    left = TensorTable.from_dict({'name': ['a', 'b'], 'id': [0.0, 1.0]})
+    right = TensorTable.from_dict({'name': ['x', 'y', 'x'], 'id': [0.0, 1.0, 2.0]})
+
+    assert len(join(left, right, 'name', 'name')) == 0
+
+
+def test_sort_merge_join_skips_sorting_presorted_sides(monkeypatch):
+    left = RelationalOperators.sort(_numeric(k=[3, 1, 2, 1], id=[0, 1, 2, 3]), 'k')
+    right = RelationalOperators.sort(_numeric(k=[2, 1, 5], id=[0, 1, 2]), 'k')
+    expected = _pairs(RelationalOperators.sort_merge_join(
+        _numeric(**{c: t.tolist() for c, t in left.columns.items()}),
+        _numeric(**{c: t.tolist() for c, t in right.columns.items()}), 'k', 'k'))
+
+    sorts = []
+    real_sort = torch.sort
+    monkeypatch.setattr(torch, 'sort', lambda *args, **kwargs: sorts.append(1) or real_sort(*args, **kwargs))
+    result = RelationalOperators.sort_merge_join(left, right, 'k', 'k')
+
+    assert sorts == []
+    assert _pairs(result) == expected
+    assert result.sorted_by == 'left_k'
+    assert result.get_column('left_k').tolist() == sorted(result.get_column('left_k').tolist())
+
+
+def test_sort_merge_join_resorts_recoded_dict_keys():
+    # Recoding into the left dictionary breaks the right side's sort order
+    left = RelationalOperators.sort(TensorTable.from_dict({'name': ['c', 'a', 'b'], 'id': [0.0, 1.0, 2.0]}), 'name')
+    right = RelationalOperators.sort(TensorTable.from_dict({'name': ['z', 'c', 'a', 'b'], 'id': [0.0, 1.0, 2.0, 3.0]}),
+                                     'name')
+
+    result = RelationalOperators.sort_merge_join(left, right, 'name', 'name')
+
+    assert sorted(_pairs(result)) == [(0.0, 1.0), (1.0, 2.0), (2.0, 3.0)]
+
+
+def test_group_by_multiple_columns_with_negative_and_float_keys():
+    table = _numeric(g1=[-1.5, 2.0, -1.5, 2.0, -1.5, 0.25],
+                     g2=[-3.0, -3.0, 0.5, -3.0, -3.0, -7.0],
+                     v=[1.0, 2.0, 4.0, 8.0, 16.0, 32.0])
+
+    result = RelationalOperators.group_by(table, ['g1', 'g2'], 'v', 'sum')
+
+    # Groups in ascending (g1, g2) order
+    assert result.to_dict() == {
+        'g1': [-1.5, -1.5, 0.25, 2.0],
+        'g2': [-3.0, 0.5, -7.0, -3.0],
+        'sum_v': [17.0, 4.0, 32.0, 10.0],
+    }
+    assert result.sorted_by == 'g1'
+
+
+def test_group_by_count_and_avg():
+    table = _numeric(g=[2.0, 1.0, 2.0, 2.0], v=[1.0, 2.0, 3.0, 8.0])
+
+    assert RelationalOperators.group_by(table, ['g'], 'v', 'count').to_dict() == \
+        {'g': [1.0, 2.0], 'count_v': [1.0, 3.0]}
+    assert RelationalOperators.group_by(table, ['g'], 'v', 'avg').to_dict() == \
+        {'g': [1.0, 2.0], 'avg_v': [2.0, 4.0]}
@@ -0,0 +1,21 @@
+import torch
+
+from tensor import TensorTable
+
+
+def test_string_columns_store_code_points():
+    table = TensorTable.from_dict({'s': ['ab', '', 'c']}, dict_encode=False)
+
+    column = table.get_column('s')
+    assert column.dtype == torch.uint8
+    assert column.tolist() == [[97, 98], [0, 0], [99, 0]]
+    assert table.to_dict() == {'s': ['ab', '', 'c']}
+
+
+def test_string_columns_beyond_latin1_and_lone_surrogates():
+    table = TensorTable.from_dict({'s': ['a\ud800', '€']}, dict_encode=False)
+
+    column = table.get_column('s')
+    assert column.dtype == torch.int32
+    assert column.tolist() == [[97, 0xD800], [0x20AC, 0]]
+    assert table.to_dict() == {'s': ['a\ud800', '€']}